@@ -0,0 +1,166 @@
+import os
+
+import pygame
+
+
+"""
+ASSET CACHE
+"""
+
+# Assets live next to the game scripts, so resolve relative paths from here
+# rather than from whatever directory the game was launched in.
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def asset_path(path):
+    """ Returns `path` resolved against the asset directory. """
+    if os.path.isabs(path):
+        return path
+    return os.path.join(ASSET_DIR, path)
+
+
+class AssetCache:
+    """
+    Decodes each sprite image once and hands out shared, pre-scaled surfaces.
+
+    Surfaces are keyed by `(path, size)`. The first request for a key decodes
+    the file, scales it and, if a display is open, converts it to the display
+    pixel format. Every later request returns the very same surface, so
+    sprites must treat their `image` as read-only.
+
+    With an atlas added (see `atlas.py`), its sprites are subsurfaces of the
+    one sheet instead of surfaces of their own, and nothing gets decoded.
+
+    `mask()` hands out collision masks the same way: one `pygame.mask.Mask`
+    per `(path, size)`, built from the surface's alpha the first time it is
+    asked for and shared by every sprite drawn with that image.
+
+    `hits` and `misses` count cache lookups so callers can confirm that no
+    decoding happens inside the frame loop.
+    """
+
+    def __init__(self):
+        self._surfaces = {}
+        self._masks = {}
+        self._converted = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, size=None):
+        """ Returns the shared surface for `path` scaled to `size`. """
+        key = (path, tuple(size) if size is not None else None)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            if key not in self._converted:
+                surface = self._convert(key, surface)
+            return surface
+
+        self.misses += 1
+        surface = self._surfaces[key] = decode_image(path, key[1])
+        return self._convert(key, surface)
+
+    def mask(self, path, size=None):
+        """ Returns the shared collision mask of `path` scaled to `size`: its pixels at least half opaque. """
+        key = (path, tuple(size) if size is not None else None)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._masks[key] = pygame.mask.from_surface(self.get(path, size))
+        return mask
+
+    def put(self, path, size, surface):
+        """
+        Stores a surface decoded elsewhere, e.g. by `decode_image()` on a
+        loader thread. Call it from the thread that owns the display.
+        """
+        key = (path, tuple(size) if size is not None else None)
+        self._surfaces[key] = surface
+        self._converted.discard(key)
+        self._masks.pop(key, None)
+        self._convert(key, surface)
+
+    def add_atlas(self, atlas):
+        """
+        Serves every sprite in `atlas` from its sheet. Call it from the thread
+        that owns the display, after the window is open, so the sheet is
+        converted once as a whole.
+        """
+        sheet = atlas.surface
+        converted = _has_display()
+        if converted:
+            sheet = sheet.convert_alpha()
+        for (path, size), rect in atlas.regions.items():
+            key = (path, tuple(size))
+            self._surfaces[key] = sheet.subsurface(rect)
+            self._masks.pop(key, None)
+            if converted:
+                self._converted.add(key)
+            else:
+                self._converted.discard(key)
+
+    def __contains__(self, spec):
+        path, size = spec
+        return (path, tuple(size) if size is not None else None) in self._surfaces
+
+    def preload(self, specs):
+        """ Decodes every `(path, size)` pair in `specs` ahead of time. """
+        for path, size in specs:
+            self.get(path, size)
+
+    def stats(self):
+        """ Returns a dict of the cache counters. """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._surfaces)}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._surfaces.clear()
+        self._converted.clear()
+        self._masks.clear()
+        self.reset_stats()
+
+    def _convert(self, key, surface):
+        # Surfaces loaded before the window opened are converted the first
+        # time they are requested afterwards.
+        if _has_display():
+            surface = surface.convert_alpha()
+            self._surfaces[key] = surface
+            self._converted.add(key)
+        return surface
+
+
+def decode_image(path, size=None):
+    """
+    Loads and scales one image without touching the cache or the display,
+    so it is safe to call from a worker thread.
+    """
+    surface = pygame.image.load(asset_path(path))
+    if size is not None:
+        surface = pygame.transform.scale(surface, tuple(size))
+    return surface
+
+
+def _has_display():
+    return pygame.display.get_init() and pygame.display.get_surface() is not None
+
+
+# Every sprite image used by the game, at every size it is drawn at.
+SPRITE_SPECS = [
+    ("player.png", (60, 60)),
+    ("coin.png", (30, 30)),
+    ("coin.png", (40, 40)),
+    ("money.png", (40, 40)),
+    ("documents.png", (40, 40)),
+    ("wall.png", (60, 60)),
+    ("house.png", (40, 40)),
+    ("house.png", (150, 150)),
+]
+
+# The images a game cannot start without. The house only drops in the last
+# level, so it can finish loading while the game is already running.
+CRITICAL_SPRITE_SPECS = [spec for spec in SPRITE_SPECS if spec[0] != "house.png"]
+
+# Shared cache used by all sprite classes.
+images = AssetCache()
@@ -0,0 +1,189 @@
+import argparse
+import json
+import math
+import os
+
+import pygame
+
+from assets import SPRITE_SPECS, asset_path, decode_image
+
+
+"""
+SPRITE ATLAS
+
+Every sprite image at every size the game draws it, packed into one sheet
+by an offline build step:
+
+    python atlas.py
+
+writes the sheet's raw RGBA pixels to `sprites.atlas` and a small index
+to `sprites.atlas.json`:
+
+    {
+      "version": 1,
+      "size": [width, height],
+      "sources": {"coin.png": [bytes, mtime_ns], ...},
+      "regions": [["coin.png", 30, 30, x, y], ...]
+    }
+
+Loading the atlas is one file read and no PNG decoding or scaling. The
+cache then hands out subsurfaces of the one sheet, see
+`assets.AssetCache.add_atlas()`. `sources` records the size and
+modification time of every PNG the atlas was built from, so a changed
+image makes the atlas stale and the game goes back to decoding PNGs until
+it is rebuilt.
+"""
+
+ATLAS_FILE = "sprites.atlas"
+ATLAS_VERSION = 1
+
+
+class AtlasError(Exception):
+    """ Raised for atlas files that are missing, stale or malformed. """
+
+
+class Atlas:
+    """ One sheet surface and the `(path, size) -> Rect` region of every sprite on it. """
+
+    def __init__(self, surface, regions):
+        self.surface = surface
+        self.regions = regions
+
+    def __len__(self):
+        return len(self.regions)
+
+    def __contains__(self, spec):
+        path, size = spec
+        return (path, tuple(size)) in self.regions
+
+    def region(self, path, size):
+        """ The sprite `path` at `size`, as a subsurface sharing the sheet's pixels. """
+        return self.surface.subsurface(self.regions[(path, tuple(size))])
+
+    def save(self, path=ATLAS_FILE):
+        """ Writes the sheet to `path` and its index to `path + ".json"`. """
+        path = asset_path(path)
+        index = {
+            "version": ATLAS_VERSION,
+            "size": list(self.surface.get_size()),
+            "sources": {source: _stat(source) for source in sorted({source for source, _ in self.regions})},
+            "regions": [[source, size[0], size[1], rect.x, rect.y]
+                        for (source, size), rect in sorted(self.regions.items())],
+        }
+        with open(path, "wb") as file:
+            file.write(pygame.image.tobytes(self.surface, "RGBA"))
+        with open(path + ".json", "w") as file:
+            json.dump(index, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path=ATLAS_FILE, specs=SPRITE_SPECS):
+        """
+        Reads an atlas saved by `save()`. Raises `AtlasError` unless it holds
+        every one of `specs` and is newer than their images. Does not touch
+        the display, so it can run on a loader thread.
+        """
+        path = asset_path(path)
+        index = read_index(path, specs)
+        width, height = index["size"]
+        try:
+            with open(path, "rb") as file:
+                pixels = file.read()
+        except OSError as error:
+            raise AtlasError(f"Cannot read {path}: {error}") from None
+        if len(pixels) != width * height * 4:
+            raise AtlasError(f"{path} holds {len(pixels)} bytes, not {width}x{height} RGBA pixels")
+        surface = pygame.image.frombytes(pixels, (width, height), "RGBA")
+        regions = {(source, (w, h)): pygame.Rect(x, y, w, h) for source, w, h, x, y in index["regions"]}
+        return cls(surface, regions)
+
+
+def read_index(path=ATLAS_FILE, specs=SPRITE_SPECS):
+    """
+    Reads and checks the index of the atlas at `path`; cheap enough to call
+    before deciding how to load sprites. Raises `AtlasError` if the atlas
+    is missing, stale or lacks any of `specs`.
+    """
+    index_path = asset_path(path) + ".json"
+    try:
+        with open(index_path) as file:
+            index = json.load(file)
+    except OSError:
+        raise AtlasError(f"No atlas at {index_path}, run `python atlas.py`") from None
+    except ValueError as error:
+        raise AtlasError(f"{index_path} is not valid JSON: {error}") from None
+    if index.get("version") != ATLAS_VERSION:
+        raise AtlasError(f"{index_path} is version {index.get('version')}, expected {ATLAS_VERSION}")
+    for source, stat in index["sources"].items():
+        if _stat(source) != stat:
+            raise AtlasError(f"{source} changed since the atlas was built, run `python atlas.py`")
+    packed = {(source, (w, h)) for source, w, h, _, _ in index["regions"]}
+    missing = [spec for spec in specs if (spec[0], tuple(spec[1])) not in packed]
+    if missing:
+        raise AtlasError(f"The atlas lacks {missing}, run `python atlas.py`")
+    return index
+
+
+def build_atlas(specs=SPRITE_SPECS, padding=1):
+    """ Decodes and scales every `(path, size)` of `specs` and packs them into a new `Atlas`. """
+    specs = [(path, tuple(size)) for path, size in dict.fromkeys((path, tuple(size)) for path, size in specs)]
+    width, height, positions = pack([size for _, size in specs], padding)
+    sheet = pygame.Surface((width, height), pygame.SRCALPHA)
+    sheet.fill((0, 0, 0, 0))
+    regions = {}
+    for (path, size), position in zip(specs, positions):
+        # Max against the transparent sheet copies the pixels exactly, alpha included
+        sheet.blit(decode_image(path, size), position, special_flags=pygame.BLEND_RGBA_MAX)
+        regions[(path, size)] = pygame.Rect(position, size)
+    return Atlas(sheet, regions)
+
+
+def pack(sizes, padding=1):
+    """
+    Shelf packs rectangles of `sizes`: tallest first, left to right in rows
+    about as wide as a square holding them all would be. Returns the sheet
+    `(width, height)` and the top left corner of each rectangle, in the
+    order given.
+    """
+    if not sizes:
+        return 1, 1, []
+    area = sum((w + padding) * (h + padding) for w, h in sizes)
+    width = max(max(w for w, _ in sizes) + padding, math.ceil(math.sqrt(area)))
+    positions = [None] * len(sizes)
+    x = y = shelf = 0
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w, h = sizes[i]
+        if x + w > width:
+            x, y = 0, y + shelf + padding
+            shelf = 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf = max(shelf, h)
+    return max(x + w for (x, _), (w, _) in zip(positions, sizes)), y + shelf, positions
+
+
+def _stat(source):
+    try:
+        stat = os.stat(asset_path(source))
+    except OSError as error:
+        raise AtlasError(f"Cannot read {source}: {error}") from None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack every sprite into one pre-decoded atlas.")
+    parser.add_argument("--check", action="store_true", help="only report whether the atlas is up to date")
+    parser.add_argument("--padding", type=int, default=1, help="transparent pixels between sprites")
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            read_index()
+        except AtlasError as error:
+            raise SystemExit(str(error))
+        print(f"{ATLAS_FILE} is up to date")
+    else:
+        atlas = build_atlas(padding=args.padding)
+        atlas.save()
+        width, height = atlas.surface.get_size()
+        print(f"Packed {len(atlas)} sprites into {width}x{height} ({width * height * 4 // 1024} KiB) "
+              f"in {ATLAS_FILE}")
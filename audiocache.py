@@ -0,0 +1,112 @@
+import hashlib
+import os
+import sys
+import tempfile
+import wave
+
+import pygame
+import pygame.mixer
+
+from assets import asset_path
+
+
+"""
+AUDIO CACHE
+
+MP3 is the most expensive format the game decodes. The first time a sound
+is needed it is decoded once, to the mixer's own sample rate, sample size
+and channel count, and written to `.audio-cache/` as a plain PCM WAV. From
+then on it loads from there with nothing to decode or resample, and the
+theme streams from it the same way.
+
+Cache files are named after the source file, a hash of its contents and
+the mixer format, e.g. `fired-3f2a9c0e5d1b7a64-44100hz-16bit-2ch.wav`, so
+editing a sound or changing the mixer settings simply misses the cache.
+The price is disk space: PCM is about ten times the size of the MP3.
+
+    python audiocache.py
+
+fills the cache ahead of time and removes files no sound uses any more,
+for images that should never decode an MP3 at all.
+"""
+
+CACHE_DIR = ".audio-cache"
+
+
+def cached_audio(path):
+    """
+    Returns the file to load the sound at `path` from: its cached WAV,
+    decoding and writing it first if needed, or `path` itself if the
+    mixer's format can't be stored as a WAV. Raises FileNotFoundError if
+    `path` does not exist. Safe to call from a worker thread.
+    """
+    source = asset_path(path)
+    target = cache_path(path)
+    if target is None:
+        return source
+    if not os.path.exists(target):
+        _write_wav(target, pygame.mixer.Sound(source).get_raw())
+    return target
+
+
+def cache_path(path):
+    """ Where the cached WAV of `path` for the current mixer format goes, or None if it can't be cached. """
+    mixer = pygame.mixer.get_init()
+    if mixer is None:
+        return None
+    frequency, size, channels = mixer
+    if size != -16:  # WAV holds signed 16 bit samples; other mixer formats load the source
+        return None
+    with open(asset_path(path), "rb") as file:
+        digest = hashlib.sha256(file.read()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(asset_path(CACHE_DIR), f"{stem}-{digest}-{frequency}hz-16bit-{channels}ch.wav")
+
+
+def _write_wav(target, samples):
+    # Written to a temporary file and renamed, so a reader never sees half a file
+    frequency, _, channels = pygame.mixer.get_init()
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            with wave.open(file, "wb") as wav:
+                wav.setnchannels(channels)
+                wav.setsampwidth(2)
+                wav.setframerate(frequency)
+                wav.writeframes(samples)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from sounds import SOUND_SPECS, THEME_FILE
+
+    parser = argparse.ArgumentParser(description="Decode every sound into the PCM cache ahead of time.")
+    parser.add_argument("--frequency", type=int, default=44100, help="mixer sample rate the game runs at")
+    parser.add_argument("--channels", type=int, default=2, help="mixer channel count the game runs at")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init(args.frequency, -16, args.channels)
+
+    kept = set()
+    for path in [spec[0] for spec in SOUND_SPECS.values()] + [THEME_FILE]:
+        try:
+            target = cached_audio(path)
+        except FileNotFoundError:
+            print(f"{path}: missing, skipped", file=sys.stderr)
+            continue
+        kept.add(os.path.basename(target))
+        print(f"{path} -> {os.path.relpath(target, asset_path('.'))}")
+
+    directory = asset_path(CACHE_DIR)
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        if name not in kept:
+            os.remove(os.path.join(directory, name))
+            print(f"removed stale {name}")
@@ -0,0 +1,268 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from bots import BOTS
+from levels import LevelTableError, load_schedule
+from simulation import (Simulation, RUN_LENGTH, TICK_RATE, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+                        INPUT_SHOOT, INPUT_BUILD)
+
+
+"""
+BALANCE RUNNER
+
+Plays many headless games with bots, spread over every CPU core, and sums
+up how the difficulty curve treats them: how far games get, where they
+end, what the scores look like and how many power-ups are caught and
+spent. Game `i` of a run uses seed `seed + i`, so a report only depends on
+its options, not on how the games were split between processes.
+
+    python balance.py --bot dodger random --games 2000 --out report.json
+"""
+
+class GameStats:
+    """ Observer that tallies the events of one game. """
+
+    def __init__(self):
+        self.events = {}
+        self.hit = None
+
+    def __call__(self, event, sim):
+        self.events[event] = self.events.get(event, 0) + 1
+        if event == "document_hit" and self.hit is None:
+            self.hit = (sim.level, describe_inputs(sim.inputs))
+
+    def result(self, sim):
+        if sim.win and sim.game_over:
+            outcome = "house"
+        elif sim.game_over:
+            outcome = "document"
+        else:
+            outcome = "timeout"
+        return {
+            "seed": sim.seed,
+            "outcome": outcome,
+            "score": sim.player.score,
+            "level": sim.level,
+            "seconds": sim.ticks / TICK_RATE,
+            "hit_level": self.hit[0] if self.hit else None,
+            "hit_action": self.hit[1] if self.hit else None,
+            "powerups": self.events.get("powerup", 0),
+            "walls": self.events.get("build", 0),
+            "events": self.events,
+        }
+
+
+def describe_inputs(inputs):
+    """ What the player was doing on a tick, for document hit causes. """
+    if inputs & INPUT_SHOOT:
+        return "shooting"
+    if inputs & INPUT_BUILD:
+        return "building"
+    if inputs & (INPUT_LEFT | INPUT_RIGHT | INPUT_UP | INPUT_DOWN):
+        return "moving"
+    return "standing"
+
+
+def play_game(bot, seed, seconds=RUN_LENGTH, backend="sprites", levels=None):
+    """ Plays one headless game with the bot called `bot` and returns its stats. """
+    policy = BOTS[bot](seed)
+    sim = Simulation(seed, backend, schedule=load_schedule(levels, TICK_RATE))
+    stats = GameStats()
+    sim.add_observer(stats)
+    for _ in range(int(seconds * TICK_RATE)):
+        if sim.game_over:
+            break
+        sim.tick(policy(sim))
+    return stats.result(sim)
+
+
+def _play_chunk(task):
+    bot, seeds, seconds, backend, levels = task
+    return [play_game(bot, seed, seconds, backend, levels) for seed in seeds]
+
+
+def run_games(bot, games, seed=0, seconds=RUN_LENGTH, backend="sprites", levels=None, jobs=None):
+    """
+    Plays `games` games with seeds `seed` to `seed + games - 1` on `jobs`
+    processes (every core by default). Returns their stats in seed order.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    seeds = list(range(seed, seed + games))
+    if jobs == 1:
+        return _play_chunk((bot, seeds, seconds, backend, levels))
+
+    # Small chunks keep every core busy to the end, even though games vary in length
+    size = max(1, min(50, games // (jobs * 8)))
+    tasks = [(bot, seeds[i:i + size], seconds, backend, levels) for i in range(0, games, size)]
+    results = []
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for chunk in pool.imap_unordered(_play_chunk, tasks):
+            results.extend(chunk)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    results.sort(key=lambda result: result["seed"])
+    return results
+
+
+"""
+REPORT
+"""
+
+def percentiles(values, points=(0, 10, 25, 50, 75, 90, 100)):
+    """ Nearest-rank percentiles of `values`, keyed "p10", "p50", ... """
+    values = sorted(values)
+    if not values:
+        return {}
+    return {f"p{point}": values[min(len(values) - 1, int(round(point / 100 * (len(values) - 1))))]
+            for point in points}
+
+
+def histogram(values, width):
+    """ Counts of `values` in buckets `width` wide, keyed by each bucket's lower bound. """
+    counts = {}
+    for value in values:
+        bucket = value // width * width
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return {str(bucket): counts[bucket] for bucket in sorted(counts)}
+
+
+def aggregate(results, schedule):
+    """ Sums up the stats of many games played with one bot. """
+    games = len(results)
+    outcomes = {"document": 0, "house": 0, "timeout": 0}
+    for result in results:
+        outcomes[result["outcome"]] += 1
+
+    levels = []
+    for level in schedule.levels:
+        reached = sum(1 for result in results if result["level"] >= level.index)
+        died = sum(1 for result in results if result["hit_level"] == level.index)
+        levels.append({
+            "level": level.index,
+            "name": level.name,
+            "reached": reached,
+            "died": died,
+            "survival": 1 - died / reached if reached else None,
+        })
+
+    hits_by_level = {}
+    hits_by_action = {}
+    for result in results:
+        if result["hit_level"] is not None:
+            hits_by_level[str(result["hit_level"])] = hits_by_level.get(str(result["hit_level"]), 0) + 1
+            hits_by_action[result["hit_action"]] = hits_by_action.get(result["hit_action"], 0) + 1
+
+    events = {}
+    for result in results:
+        for event, count in result["events"].items():
+            events[event] = events.get(event, 0) + count
+
+    scores = [result["score"] for result in results]
+    seconds = [result["seconds"] for result in results]
+    powerups = [result["powerups"] for result in results]
+    return {
+        "games": games,
+        "outcomes": outcomes,
+        "survival_seconds": dict(mean=sum(seconds) / games, **percentiles(seconds)),
+        "levels": levels,
+        "score": dict(mean=sum(scores) / games, **percentiles(scores), histogram=histogram(scores, 1000)),
+        "document_hits": {"by_level": hits_by_level, "by_action": hits_by_action},
+        "powerups": {
+            "caught_mean": sum(powerups) / games,
+            "spent_mean": sum(result["walls"] for result in results) / games,
+            "caught": {str(count): powerups.count(count) for count in sorted(set(powerups))},
+        },
+        "events_per_game": {event: count / games for event, count in sorted(events.items())},
+    }
+
+
+def print_summary(report):
+    for bot, summary in report["bots"].items():
+        outcomes = summary["outcomes"]
+        survival = summary["survival_seconds"]
+        score = summary["score"]
+        print(f"\n{bot}: {summary['games']} games, {outcomes['document']} hit by documents, "
+              f"{outcomes['house']} reached the house, {outcomes['timeout']} ran out of time")
+        print(f"  survived  mean {survival['mean']:.1f}s  p10 {survival['p10']:.1f}s  "
+              f"p50 {survival['p50']:.1f}s  p90 {survival['p90']:.1f}s")
+        print(f"  score     mean {score['mean']:.0f}  p10 {score['p10']}  p50 {score['p50']}  "
+              f"p90 {score['p90']}  max {score['p100']}")
+        print(f"  power-ups caught {summary['powerups']['caught_mean']:.2f}  "
+              f"spent {summary['powerups']['spent_mean']:.2f} per game")
+        print("  hits by action  " + "  ".join(f"{action} {count}" for action, count
+                                              in sorted(summary["document_hits"]["by_action"].items())))
+        print(f"  {'level':>5} {'name':<26} {'reached':>8} {'died':>6} {'survival':>9}")
+        for level in summary["levels"]:
+            if not level["reached"]:
+                break
+            print(f"  {level['level']:>5} {level['name']:<26} {level['reached']:>8} {level['died']:>6} "
+                  f"{level['survival']:>8.1%}")
+
+
+"""
+COMMAND LINE
+"""
+
+def positive_int(text):
+    """ argparse type for counts that must be at least 1. """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Play many headless games with bots and report on game balance.")
+    parser.add_argument("--bot", nargs="+", choices=sorted(BOTS), default=["dodger"])
+    parser.add_argument("--games", type=positive_int, default=1000, help="games per bot")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--seconds", type=float, default=RUN_LENGTH, help="longest a game may last")
+    parser.add_argument("--backend", choices=("sprites", "numpy"), default="sprites")
+    parser.add_argument("--levels", metavar="FILE", default=None, help="level table to play (default: levels.json)")
+    parser.add_argument("--jobs", type=positive_int, default=None, help="processes to use (default: one per core)")
+    parser.add_argument("--out", metavar="FILE", default=None, help="write the full report to FILE as JSON")
+    args = parser.parse_args(args)
+
+    try:
+        schedule = load_schedule(args.levels, TICK_RATE)
+    except (OSError, LevelTableError) as error:
+        print(f"{args.levels or 'levels.json'}: {error}")
+        return 1
+
+    report = {
+        "games": args.games,
+        "seed": args.seed,
+        "seconds": args.seconds,
+        "backend": args.backend,
+        "levels": schedule.name,
+        "jobs": args.jobs or os.cpu_count(),
+        "bots": {},
+    }
+    start = time.perf_counter()
+    for bot in args.bot:
+        results = run_games(bot, args.games, args.seed, args.seconds, args.backend, args.levels, args.jobs)
+        report["bots"][bot] = aggregate(results, schedule)
+    report["duration"] = time.perf_counter() - start
+
+    print_summary(report)
+    games = args.games * len(args.bot)
+    print(f"\n{games} games in {report['duration']:.1f}s on {report['jobs']} processes "
+          f"({games / report['duration']:.1f} games/s)")
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Wrote report to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
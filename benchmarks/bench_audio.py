@@ -0,0 +1,85 @@
+"""
+Audio benchmark: the CPU cost of sounds loaded from their MP3s against the
+same sounds loaded from the PCM audio cache, see `audiocache.py`.
+
+    effects    CPU time to load each effect, median of several loads, and
+               the total for all of them, i.e. what startup spends on sound
+    streaming  CPU time per second of audio while `pygame.mixer.music`
+               plays a file, measured over a few seconds of playback
+
+The theme is not part of this tree, so the longest effect stands in for it
+when measuring streaming. Runs under the SDL dummy audio driver, which
+mixes in real time like a sound card would but outputs nothing; CPU time
+is the process's, so it includes the mixer thread.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_audio
+"""
+import os
+import statistics
+import time
+
+import pygame
+
+from audiocache import cached_audio
+from assets import asset_path
+from sounds import SOUND_SPECS
+
+
+LOADS = 9
+STREAM_SECONDS = 3.0
+
+
+def load_cost(path):
+    """ Median CPU milliseconds to load `path` into a `pygame.mixer.Sound`. """
+    times = []
+    for _ in range(LOADS):
+        start = time.process_time()
+        pygame.mixer.Sound(path)
+        times.append(time.process_time() - start)
+    return statistics.median(times) * 1000
+
+
+def stream_cost(path):
+    """ CPU milliseconds per second of audio spent streaming `path`. """
+    pygame.mixer.music.load(path)
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    pygame.mixer.music.play(-1)
+    time.sleep(STREAM_SECONDS)
+    cpu = time.process_time() - start_cpu
+    elapsed = time.perf_counter() - start_wall
+    pygame.mixer.music.stop()
+    pygame.mixer.music.unload()
+    return cpu * 1000 / elapsed
+
+
+def main():
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init()
+    print(f"Mixer {pygame.mixer.get_init()}, buffer default, {LOADS} loads a sound")
+
+    paths = [path for path, _, _ in SOUND_SPECS.values()]
+    cached = {path: cached_audio(path) for path in paths}  # Fills the cache first
+
+    print(f"{'effect':>16} {'seconds':>8} {'mp3 ms':>8} {'cached ms':>10} {'speedup':>8}")
+    totals = [0.0, 0.0]
+    for path in paths:
+        mp3, wav = load_cost(asset_path(path)), load_cost(cached[path])
+        totals[0] += mp3
+        totals[1] += wav
+        length = pygame.mixer.Sound(cached[path]).get_length()
+        print(f"{path:>16} {length:>8.2f} {mp3:>8.2f} {wav:>10.2f} {mp3 / max(wav, 1e-6):>7.1f}x")
+    print(f"{'all effects':>16} {'':>8} {totals[0]:>8.2f} {totals[1]:>10.2f} "
+          f"{totals[0] / max(totals[1], 1e-6):>7.1f}x")
+
+    theme = max(paths, key=lambda path: pygame.mixer.Sound(cached[path]).get_length())
+    print(f"\nStreaming {theme} as a stand-in theme for {STREAM_SECONDS:.0f}s")
+    print(f"{'source':>16} {'CPU ms per audio second':>24}")
+    print(f"{'mp3':>16} {stream_cost(asset_path(theme)):>24.2f}")
+    print(f"{'cached':>16} {stream_cost(cached[theme]):>24.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
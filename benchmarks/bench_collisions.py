@@ -0,0 +1,138 @@
+"""
+Collision benchmark: per-sprite `spritecollide` scans against the batched
+`CollisionIndex` pass, and against a uniform grid spatial hash.
+
+Scatters N falling objects and a wall plus a few coins over the screen and
+times one frame's worth of projectile and player collision queries all
+three ways, for growing N:
+
+    linear   `pygame.sprite.spritecollide()` for every projectile
+    indexed  `CollisionIndex`, a flat rect list scanned in C
+    grid     `GridIndex` below, rebuilt every frame like the index: each
+             sprite filed under the GRID_CELL square cells it covers, and
+             each query testing only the sprites in its own cells
+
+The grid is the approach `CollisionIndex` was chosen over; it is kept here
+so that choice can be checked. Each way takes turns with the others and
+the best of REPEATS counts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_collisions
+"""
+import random
+import time
+
+import pygame
+
+from collision import CollisionIndex
+from simulation import WIDTH, HEIGHT
+
+
+FALLING_COUNTS = [10, 25, 50, 100, 200, 400, 800]
+PROJECTILES = 10 + 5  # One wall of 10 segments plus a burst of coins
+FRAMES = 200
+REPEATS = 5
+GRID_CELL = 64  # Bigger than a falling object, so most cover at most 4 cells
+
+
+def make_sprites(count, size, rng):
+    group = pygame.sprite.Group()
+    for _ in range(count):
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(rng.randint(0, WIDTH - size), rng.randint(-size, HEIGHT), size, size)
+        group.add(sprite)
+    return group
+
+
+def linear_frame(falling, projectiles, player):
+    hits = 0
+    for projectile in projectiles:
+        hits += len(pygame.sprite.spritecollide(projectile, falling, False))
+    hits += len(pygame.sprite.spritecollide(player, falling, False))
+    return hits
+
+
+def indexed_frame(index, falling, projectiles, player):
+    index.rebuild(falling)
+    hits = 0
+    for _, found in index.collide(projectiles):
+        hits += len(found)
+    hits += len(index.query(player.rect))
+    return hits
+
+
+class GridIndex:
+    """ Uniform grid spatial hash with the query interface of `CollisionIndex`. """
+
+    def __init__(self, cell=GRID_CELL):
+        self.cell = cell
+        self.sprites = []
+        self.cells = {}
+
+    def rebuild(self, sprites):
+        self.sprites = sprites.sprites() if hasattr(sprites, "sprites") else list(sprites)
+        cells = {}
+        for i, sprite in enumerate(self.sprites):
+            for key in self._keys(sprite.rect):
+                cells.setdefault(key, []).append(i)
+        self.cells = cells
+
+    def query(self, rect):
+        cells, candidates = self.cells, set()
+        for key in self._keys(rect):
+            candidates.update(cells.get(key, ()))
+        sprites = self.sprites
+        # Sorted so hits come back in group order, as the other two ways return them
+        return [sprites[i] for i in sorted(candidates) if rect.colliderect(sprites[i].rect)]
+
+    def collide(self, sprites):
+        for sprite in sprites:
+            found = self.query(sprite.rect)
+            if found:
+                yield sprite, found
+
+    def _keys(self, rect):
+        cell = self.cell
+        return [(x, y) for x in range(rect.left // cell, (rect.right - 1) // cell + 1)
+                for y in range(rect.top // cell, (rect.bottom - 1) // cell + 1)]
+
+
+def time_frames(runs):
+    """ Best of REPEATS for each of `runs`, taking turns: microseconds a frame, and the hits. """
+    best = [None] * len(runs)
+    hits = [0] * len(runs)
+    for _ in range(REPEATS):
+        for i, run in enumerate(runs):
+            start = time.perf_counter()
+            for _ in range(FRAMES):
+                hits[i] = run()
+            elapsed = (time.perf_counter() - start) / FRAMES * 1e6
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return list(zip(best, hits))
+
+
+def main():
+    rng = random.Random(1)
+    player = pygame.sprite.Sprite()
+    player.rect = pygame.Rect(WIDTH // 2 - 30, HEIGHT - 80, 60, 60)
+    index = CollisionIndex()
+    grid = GridIndex()
+
+    print(f"{'falling':>8} {'linear us/frame':>16} {'indexed us/frame':>17} {'grid us/frame':>14} "
+          f"{'indexed speedup':>16} {'grid speedup':>13}")
+    for count in FALLING_COUNTS:
+        falling = make_sprites(count, 40, rng)
+        projectiles = make_sprites(PROJECTILES, 45, rng)
+        (linear, linear_hits), (indexed, indexed_hits), (gridded, grid_hits) = time_frames([
+            lambda: linear_frame(falling, projectiles, player),
+            lambda: indexed_frame(index, falling, projectiles, player),
+            lambda: indexed_frame(grid, falling, projectiles, player),
+        ])
+        assert linear_hits == indexed_hits == grid_hits, (linear_hits, indexed_hits, grid_hits)
+        print(f"{count:>8} {linear:>16.1f} {indexed:>17.1f} {gridded:>14.1f} "
+              f"{linear / indexed:>15.2f}x {linear / gridded:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
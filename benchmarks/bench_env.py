@@ -0,0 +1,48 @@
+"""
+Batched environment benchmark: game steps per second through
+`env.BatchEnv.step_batch()`, observations included.
+
+Every game gets a random input bitmask each tick, drawn up front so the
+agent costs nothing. Reports game steps per second (batch steps times batch
+size) for several batch sizes on both falling object backends.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_env
+"""
+import time
+
+import numpy as np
+
+from env import BatchEnv
+from simulation import RUN_LENGTH, TICK_RATE, init_headless
+
+
+BATCH_SIZES = [1, 16, 64, 256]
+STEPS = 600
+
+
+def steps_per_second(backend, count):
+    env = BatchEnv(count, seed=1, backend=backend, max_ticks=RUN_LENGTH * TICK_RATE)
+    env.reset()
+    # Mostly moving, sometimes shooting; never building, which stacks up walls forever
+    actions = np.random.default_rng(1).choice([0, 1, 2, 1 | 16, 2 | 16], size=(STEPS, count))
+    start = time.perf_counter()
+    for step in range(STEPS):
+        env.step_batch(actions[step])
+    return STEPS * count / (time.perf_counter() - start), len(env.episodes)
+
+
+def main():
+    init_headless()
+
+    print(f"{STEPS} batch steps per run")
+    print(f"{'games':>6} {'backend':>8} {'game steps/s':>13} {'games ended':>12}")
+    for count in BATCH_SIZES:
+        for backend in ("sprites", "numpy"):
+            rate, ended = steps_per_second(backend, count)
+            print(f"{count:>6} {backend:>8} {rate:>13.0f} {ended:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Falling object backend benchmark: per-sprite updates against the NumPy
+structure-of-arrays backend.
+
+Keeps N falling objects on screen with the player invincible and reports
+how many simulation ticks per second each backend sustains, and whether
+that is enough for 60 Hz.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_falling
+"""
+import time
+
+from assets import images, SPRITE_SPECS
+from simulation import TICK_RATE, init_headless, run_headless
+
+
+COUNTS = [100, 500, 1000, 2000, 5000, 10000]
+SECONDS = 2
+
+
+def ticks_per_second(backend, count):
+    start = time.perf_counter()
+    sim = run_headless(SECONDS, seed=1, backend=backend, stress=count)
+    return sim.ticks / (time.perf_counter() - start)
+
+
+def slow_flag(rate):
+    return "" if rate >= TICK_RATE else "*"
+
+
+def main():
+    init_headless()
+    images.preload(SPRITE_SPECS)
+
+    print(f"{'objects':>8} {'sprites ticks/s':>16} {'numpy ticks/s':>14} {'speedup':>8}")
+    for count in COUNTS:
+        sprites = ticks_per_second("sprites", count)
+        numpy = ticks_per_second("numpy", count)
+        print(f"{count:>8} {sprites:>15.0f}{slow_flag(sprites):1} {numpy:>13.0f}{slow_flag(numpy):1} {numpy / sprites:>7.1f}x")
+    print(f"* below {TICK_RATE} ticks/s, too slow for real time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Frame rate independence benchmark: the same games played at 30, 60 and
+144 frames a second, and at a jittery rate, must come out identical.
+
+Each frame steps the simulation by the frame's length, the way the game
+loop does, and draws it with interpolation through both renderers. The
+player is a `bots.DodgerBot` asked for inputs once per tick, so a tick
+gets the same inputs however the ticks fall across frames. Reports each
+game's score, level, ticks and events, plus the draw cost per frame, and
+exits non-zero if any frame rate changed the outcome.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_framerate
+"""
+import random
+import time
+
+import pygame
+
+from assets import images, SPRITE_SPECS
+from bots import DodgerBot
+from inputs import ScriptedInput
+from render import RENDERERS
+from simulation import Simulation, WIDTH, HEIGHT, TICK_RATE, init_headless
+
+
+SEEDS = [1, 2, 3]
+SECONDS = 60
+RATES = [30, 60, 144, "jitter"]  # "jitter": every frame between 4 and 40 ms
+
+
+def frame_times(rate, seconds):
+    """ The length of every frame in `seconds` of play at `rate` frames a second. """
+    if rate == "jitter":
+        jitter = random.Random(0)
+        total = 0.0
+        while total < seconds:
+            dt = min(jitter.uniform(0.004, 0.040), seconds - total)
+            total += dt
+            yield dt
+    else:
+        for _ in range(round(seconds * rate)):
+            yield 1 / rate
+
+
+def play(seed, backend, rate, renderer):
+    sim = Simulation(seed, backend)
+    sim.interpolate = True
+    sim.input_provider = ScriptedInput(DodgerBot(seed))
+    events = []
+    sim.add_observer(lambda event, sim: events.append((sim.ticks, event)))
+
+    frames = 0
+    draw_time = 0.0
+    for dt in frame_times(rate, SECONDS):
+        sim.step(dt=dt)
+        start = time.perf_counter()
+        renderer.draw(sim)
+        renderer.present()
+        draw_time += time.perf_counter() - start
+        frames += 1
+        if sim.game_over:
+            break
+    outcome = (sim.player.score, sim.level, sim.ticks, tuple(events))
+    return outcome, frames, draw_time / frames
+
+
+def main():
+    init_headless()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    images.preload(SPRITE_SPECS)
+
+    print(f"Up to {SECONDS}s of play a game, {TICK_RATE} ticks a second")
+    print(f"{'seed':>4} {'backend':>8} {'renderer':>8} {'rate':>7} {'score':>6} {'level':>5} "
+          f"{'ticks':>6} {'frames':>7} {'draw ms':>8} {'outcome':>10}")
+    mismatches = 0
+    for seed in SEEDS:
+        for backend in ("sprites", "numpy"):
+            for name, renderer_class in sorted(RENDERERS.items()):
+                reference = None
+                for rate in RATES:
+                    outcome, frames, draw = play(seed, backend, rate, renderer_class(screen))
+                    if reference is None:
+                        reference = outcome
+                    same = outcome == reference
+                    mismatches += not same
+                    score, level, ticks, _ = outcome
+                    print(f"{seed:>4} {backend:>8} {name:>8} {rate:>7} {score:>6} {level:>5} {ticks:>6} "
+                          f"{frames:>7} {draw * 1000:>8.3f} {'identical' if same else 'DIFFERENT':>10}")
+
+    if mismatches:
+        print(f"MISMATCH: {mismatches} runs played out differently from 30 fps")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
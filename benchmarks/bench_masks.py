@@ -0,0 +1,172 @@
+"""
+Collision mask benchmark: the two-phase pixel test against rect-only
+collision, on the worlds of a real late-level game.
+
+Plays an invincible game that shoots, builds the odd wall and never dies,
+and keeps a snapshot of every tick from level LATE_LEVEL on, taken after
+everything has moved and before collisions are settled: the player, each
+falling object, coin and wall. Then times one tick's collision queries (coins and
+walls against documents, the player against everything) over all of the
+snapshots, both ways and on both backends:
+
+    rect   the broadphase alone, every overlapping rect is a hit
+    mask   the broadphase, then the shared masks of only the overlapping
+           pairs, see `collision.touching()`
+
+Nothing is removed, so both ways see the same worlds. Reports the cost a
+tick, the overhead of masks over rects, both relative to rect-only
+collision and as a share of a frame at the tick rate, and how many rect
+hits the masks turned into misses.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_masks
+"""
+import time
+
+import pygame
+
+from assets import images, SPRITE_SPECS
+from collision import CollisionIndex
+from fallingarray import FallingArray, KIND_DOCUMENTS, KIND_MASK
+from profiling import NullProfiler
+from simulation import (Simulation, HEIGHT, RUN_LENGTH, TICK_RATE, INPUT_LEFT, INPUT_RIGHT, INPUT_SHOOT,
+                        INPUT_BUILD, init_headless)
+
+
+SEED = 1
+LATE_LEVEL = 13
+REPEATS = 15
+
+
+class Snapshot:
+    """ Plain sprites standing in for one tick's world, with or without masks. """
+
+    def __init__(self, sim, masked):
+        self.player = _copy(sim.player, masked)
+        self.falling = [_copy(obj, masked) for obj in sim.falling_objects]
+        for sprite, obj in zip(self.falling, sim.falling_objects):
+            sprite.kind = obj.kind
+        self.coins = [_copy(sprite, masked) for sprite in sim.shooting_objects]
+        self.walls = [_copy(sprite, masked) for sprite in sim.building_objects]
+        self.array = FallingArray(HEIGHT)
+        for sprite in self.falling:
+            self.array.spawn(sprite.kind, sprite.rect.x, sprite.rect.y, 0)
+
+
+def _copy(sprite, masked):
+    copy = pygame.sprite.Sprite()
+    copy.rect = sprite.rect.copy()
+    copy.mask = getattr(sprite, "mask", None) if masked else None
+    return copy
+
+
+def policy(tick):
+    """ Sways left and right, shooting every 10 ticks and building a wall every 10 seconds. """
+    inputs = INPUT_LEFT if (tick // 120) % 2 else INPUT_RIGHT
+    if tick % 10 < 5:
+        inputs |= INPUT_SHOOT
+    if tick % (10 * TICK_RATE) < 5:
+        inputs |= INPUT_BUILD
+    return inputs
+
+
+class SnapshotProfiler(NullProfiler):
+    """ Snapshots the world, with and without masks, as each late-level tick starts its collisions. """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.snapshots = []
+
+    def section(self, name):
+        if name == "collisions" and self.sim.level >= LATE_LEVEL:
+            self.snapshots.append((Snapshot(self.sim, False), Snapshot(self.sim, True)))
+        return super(SnapshotProfiler, self).section(name)
+
+
+def record():
+    """ Snapshots of every late-level tick of one game. """
+    sim = Simulation(SEED)
+    sim.invincible = True
+    sim.profiler = SnapshotProfiler(sim)
+    for tick in range(RUN_LENGTH * TICK_RATE):
+        sim.tick(policy(tick))
+    return sim.profiler.snapshots
+
+
+def sprites_tick(index, snapshot):
+    index.rebuild(snapshot.falling)
+    hits = 0
+    for projectiles in (snapshot.coins, snapshot.walls):
+        for _, found in index.collide(projectiles):
+            hits += sum(obj.kind == KIND_DOCUMENTS for obj in found)
+    return hits + len(index.query(snapshot.player.rect, snapshot.player.mask))
+
+
+def numpy_tick(snapshot, masked):
+    # The same steps as `Simulation.collide_projectiles()` and `collide_player()`
+    array = snapshot.array
+    if not len(array):
+        return 0
+    hits = 0
+    for projectiles in (snapshot.coins, snapshot.walls):
+        if projectiles:
+            overlaps = array.overlapping_rects([sprite.rect for sprite in projectiles], KIND_DOCUMENTS)
+            for i in overlaps.any(axis=1).nonzero()[0].tolist():
+                row = overlaps[i]
+                if masked:
+                    row = array.narrow(row, projectiles[i].rect, projectiles[i].mask)
+                hits += int(row.sum())
+    player = snapshot.player
+    if masked:
+        return hits + len(array.kinds(array.touching(player.rect, player.mask)))
+    return hits + len(array.kinds(array.overlapping(player.rect)))
+
+
+def time_ticks(runs, snapshots):
+    """
+    Best of REPEATS for each of `runs`, taking turns so they share whatever
+    else the machine is doing: microseconds a tick, and the total hits.
+    """
+    best = [None] * len(runs)
+    hits = [0] * len(runs)
+    for _ in range(REPEATS):
+        for i, run in enumerate(runs):
+            start = time.perf_counter()
+            hits[i] = sum(run(snapshot) for snapshot in snapshots)
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return [(elapsed / len(snapshots) * 1e6, count) for elapsed, count in zip(best, hits)]
+
+
+def main():
+    init_headless()
+    pygame.display.set_mode((1, 1))
+    images.preload(SPRITE_SPECS)
+    for spec in KIND_MASK.values():
+        if spec is not None:
+            images.mask(*spec)  # Built once up front, as the game's sprites do
+
+    snapshots = record()
+    falling = sum(len(plain.falling) for plain, _ in snapshots) / len(snapshots)
+    projectiles = sum(len(plain.coins) + len(plain.walls) for plain, _ in snapshots) / len(snapshots)
+    print(f"Seed {SEED}, {len(snapshots)} ticks from level {LATE_LEVEL} on: "
+          f"{falling:.1f} falling objects and {projectiles:.1f} coins and walls a tick")
+    print(f"{'backend':>8} {'rect us':>8} {'mask us':>8} {'overhead':>9} {'of frame':>9} "
+          f"{'rect hits':>10} {'mask hits':>10}")
+
+    index = CollisionIndex()
+    runs = {
+        "sprites": (lambda pair: sprites_tick(index, pair[0]), lambda pair: sprites_tick(index, pair[1])),
+        "numpy": (lambda pair: numpy_tick(pair[0], False), lambda pair: numpy_tick(pair[1], True)),
+    }
+    frame = 1e6 / TICK_RATE
+    for backend, backend_runs in runs.items():
+        (rect_time, rect_hits), (mask_time, mask_hits) = time_ticks(backend_runs, snapshots)
+        print(f"{backend:>8} {rect_time:>8.2f} {mask_time:>8.2f} {(mask_time / rect_time - 1) * 100:>8.1f}% "
+              f"{(mask_time - rect_time) / frame * 100:>8.3f}% {rect_hits:>10} {mask_hits:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
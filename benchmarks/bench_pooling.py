@@ -0,0 +1,104 @@
+"""
+Sprite pooling benchmark: a full 3:23 run with pooled sprites against the
+same run with every sprite built fresh.
+
+The player is invincible and fires a coin and builds a wall every few
+ticks, so coins, walls and falling objects churn the whole way. Several
+games are played back to back on one `Simulation`, the way restarts work
+in the game. Reports sprites constructed, how many were reused, the most
+in use at once, and how often and how long the garbage collector ran.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pooling
+"""
+import gc
+import time
+
+from assets import images, SPRITE_SPECS
+from simulation import (Simulation, RUN_LENGTH, TICK_RATE, INPUT_LEFT, INPUT_RIGHT,
+                        INPUT_SHOOT, INPUT_BUILD, init_headless)
+
+
+GAMES = 3
+SEED = 1
+
+
+def policy(tick):
+    """ Sways left and right, shooting every 10 ticks and building every 90. """
+    inputs = INPUT_LEFT if (tick // 120) % 2 else INPUT_RIGHT
+    if tick % 10 < 5:
+        inputs |= INPUT_SHOOT
+    if tick % 90 < 5:
+        inputs |= INPUT_BUILD
+    return inputs
+
+
+class GCWatch:
+    """ Counts garbage collections and the time spent in them. """
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pause = 0.0
+        self._start = 0.0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.pause += time.perf_counter() - self._start
+            self.collections[info["generation"]] += 1
+
+
+def run(pooling):
+    sim = Simulation(SEED, pooling=pooling)
+    sim.invincible = True
+    watch = GCWatch()
+    gc.collect()
+    gc.callbacks.append(watch)
+    start = time.perf_counter()
+    try:
+        for game in range(GAMES):
+            if game:
+                sim.reset(SEED)
+            for tick in range(RUN_LENGTH * TICK_RATE):
+                sim.tick(policy(tick))
+    finally:
+        gc.callbacks.remove(watch)
+    duration = time.perf_counter() - start
+
+    stats = sim.pool_stats().values()
+    return {
+        "score": sim.player.score,
+        "created": sum(pool["created"] for pool in stats),
+        "reused": sum(pool["reused"] for pool in stats),
+        "high_water": sum(pool["high_water"] for pool in stats),
+        "collections": watch.collections,
+        "pause": watch.pause,
+        "duration": duration,
+    }
+
+
+def main():
+    init_headless()
+    images.preload(SPRITE_SPECS)
+
+    print(f"{GAMES} games of {RUN_LENGTH}s, seed {SEED}")
+    print(f"{'':>9} {'score':>7} {'created':>8} {'reused':>8} {'high water':>11} "
+          f"{'gc gen0/1/2':>14} {'gc ms':>7} {'run s':>7}")
+    results = {}
+    for pooling in (False, True):
+        result = results[pooling] = run(pooling)
+        collections = "/".join(str(count) for count in result["collections"])
+        print(f"{'pooled' if pooling else 'unpooled':>9} {result['score']:>7} {result['created']:>8} "
+              f"{result['reused']:>8} {result['high_water']:>11} {collections:>14} "
+              f"{result['pause'] * 1000:>7.2f} {result['duration']:>7.2f}")
+
+    if results[False]["score"] != results[True]["score"]:
+        print("MISMATCH: pooling changed the outcome")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
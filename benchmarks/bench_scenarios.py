@@ -0,0 +1,347 @@
+"""
+Game loop scenario benchmark: the frames of `ChatGPTGame.py` itself, input
+to present, in a few fixed situations, checked against a stored baseline.
+
+    idle      level 0 with the player standing still
+    storm     the document storm of levels 10 to 19, a level at a time
+    walls     `Player.build()` every half second at level 0, walls piling up
+    coins     bursts of coin shooting at level 0: a shot every other tick
+              for a second, then a second's rest
+    gameover  the game over screen held --hold seconds, typing initials a
+              key every quarter second, erasing them and typing them again,
+              then confirming them a second before the end
+
+Every scenario starts from the same seed, with an invincible player so the
+game never ends early. It plays a level table cut down to its levels from
+the classic one, each level given an even share of the frames, so it stays
+in them however long it runs. It steps one tick a frame as if on a 60 Hz
+display, but without waiting for it. The scenarios are played in turns,
+once to warm up, then --repeats times for timing, reporting the median
+over the plays of frames per second and p50, p95 and p99 frame times.
+Each is then played once more under `tracemalloc` for memory, reporting
+the Python heap's peak growth and the memory blocks each frame leaves
+allocated. Python has no counter of every allocation, so the blocks are
+the net: steady growth there is a leak.
+
+    --save-baseline FILE  writes the results as a baseline, along with the
+                          settings they were taken with
+    --baseline FILE       compares against one, and exits 1 if any metric
+                          got worse by more than --threshold percent, by
+                          more than its noise floor and by more than NOISE
+                          times the spread of the plays in both runs
+
+A baseline saved with another renderer, backend, frame count or hold is
+refused, exiting 2. Baselines only mean something on the machine they were
+saved on, and even there a whole run can come out 20-odd percent slower
+than the last on a busy machine, which no spread within a run shows: the
+default threshold sits above that. Run from the repository root:
+
+    python -m benchmarks.bench_scenarios --save-baseline baseline.json
+    python -m benchmarks.bench_scenarios --baseline baseline.json
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pygame
+
+import ChatGPTGame as game
+from assets import asset_path
+from inputs import ScriptedInput
+from levels import LevelSchedule, DEFAULT_LEVELS
+from scoredb import open_scores
+from simulation import TICK_RATE, INPUT_SHOOT, init_headless
+
+
+SEED = 1
+FRAME_MS = 1000 / TICK_RATE
+NOISE = 3  # Spreads a difference must exceed, see `regressions()`
+
+# name: (higher is better, noise floor: differences smaller than this never count)
+METRICS = {
+    "fps": (True, 50.0),
+    "p50_ms": (False, 0.05),
+    "p95_ms": (False, 0.05),
+    "p99_ms": (False, 0.1),
+    "peak_kib": (False, 64.0),
+    "blocks_per_frame": (False, 1.0),
+}
+
+# Settings a baseline is saved with, which a comparison must share
+SETTINGS = ("seed", "renderer", "backend", "frames", "hold")
+
+
+class FixedClock:
+    """ Stands in for `pygame.time.Clock`: every frame took one tick, and nothing waits. """
+
+    def tick(self, framerate=0):
+        return FRAME_MS
+
+
+"""
+SCENARIOS
+"""
+
+class Scenario:
+    """ How to set up a game and what to do to it every frame. """
+
+    def __init__(self, name, frames, levels=(0, 0), script=None, invincible=True, setup=None, each_frame=None):
+        self.name = name
+        self.frames = frames
+        self.levels = levels  # First and last level of the classic table to play
+        self.script = script
+        self.invincible = invincible
+        self.setup = setup
+        self.each_frame = each_frame
+
+    def schedule(self):
+        """ The classic level table cut down to `levels`, spread evenly over the frames. """
+        with open(asset_path(DEFAULT_LEVELS)) as file:
+            rows = json.load(file)["levels"]
+        first, last = self.levels
+        rows = [dict(row, start=0) for row in rows[first:last + 1]]
+        seconds = self.frames / TICK_RATE / len(rows)
+        for index, row in enumerate(rows):
+            row["start"] = index * seconds
+        return LevelSchedule(rows, TICK_RATE, f"{self.name} scenario")
+
+    def start(self):
+        """ Starts a fresh game in the game module, set up for this scenario. """
+        game.restart_game()
+        sim = game.sim
+        sim.schedule = self.schedule()
+        sim.input_provider = ScriptedInput(self.script or (lambda sim: 0))
+        sim.reset(SEED)
+        sim.invincible = self.invincible
+        if self.setup is not None:
+            self.setup(sim)
+
+    def frame(self, index):
+        if self.each_frame is not None:
+            self.each_frame(game.sim, index)
+
+
+def build_walls(sim, index):
+    if index % (TICK_RATE // 2) == 0:
+        sim.player.build()
+
+
+def coin_bursts(sim):
+    return INPUT_SHOOT if sim.ticks % 2 == 0 and (sim.ticks // TICK_RATE) % 2 == 0 else 0
+
+
+# Keys typed over and over on the game over screen: initials, then erased
+INITIALS_KEYS = [(pygame.K_a, "A"), (pygame.K_b, "B"), (pygame.K_c, "C")] + [(pygame.K_BACKSPACE, "")] * 3
+
+
+def end_game(directory):
+    """ Ends the game in front of a new, empty score table, so every play is asked for initials. """
+    files = (os.path.join(directory, f"high_scores-{n}.txt") for n in itertools.count())
+
+    def setup(sim):
+        game.high_score_table.close()
+        game.high_score_table = open_scores(next(files), writer=game.writer)
+        sim.game_over = True
+    return setup
+
+
+def enter_initials(frames):
+    """ Types INITIALS_KEYS a key every quarter second, then types a letter and confirms a second before the end. """
+    confirm = max(frames - TICK_RATE, 0)
+
+    def each_frame(sim, index):
+        if index == confirm:
+            _press(pygame.K_a, "A")
+            _press(pygame.K_RETURN, "\r")
+        elif index < confirm and index % (TICK_RATE // 4) == 0:
+            _press(*INITIALS_KEYS[index // (TICK_RATE // 4) % len(INITIALS_KEYS)])
+    return each_frame
+
+
+def _press(key, text):
+    for kind in (pygame.KEYDOWN, pygame.KEYUP):
+        pygame.event.post(pygame.event.Event(kind, key=key, unicode=text, mod=0, scancode=0))
+
+
+def scenarios(frames, hold, directory):
+    held = round(hold * TICK_RATE)
+    return [
+        Scenario("idle", frames),
+        Scenario("storm", frames, levels=(10, 19)),
+        Scenario("walls", frames, each_frame=build_walls),
+        Scenario("coins", frames, script=coin_bursts),
+        Scenario("gameover", held, invincible=False, setup=end_game(directory), each_frame=enter_initials(held)),
+    ]
+
+
+"""
+MEASURING
+"""
+
+def play_timings(scenario):
+    """ Frames per second and p50, p95 and p99 frame times of one play of `scenario`. """
+    scenario.start()
+    gc.collect()
+    times = []
+    for index in range(scenario.frames):
+        scenario.frame(index)
+        start = time.perf_counter()
+        game.run_frame()
+        times.append(time.perf_counter() - start)
+    cuts = statistics.quantiles(times, n=100)
+    return {"fps": len(times) / sum(times), "p50_ms": cuts[49] * 1000, "p95_ms": cuts[94] * 1000,
+            "p99_ms": cuts[98] * 1000}
+
+
+def time_scenarios(scenarios, repeats):
+    """
+    The median and the spread, the median absolute deviation, of each
+    timing metric over `repeats` plays of every scenario, by name. The
+    scenarios take turns, so the machine getting faster or slower during
+    the run shows up in every spread instead of in some scenarios'
+    medians. A first round warms up caches and is not counted.
+    """
+    plays = {scenario.name: [] for scenario in scenarios}
+    for turn in range(repeats + 1):
+        for scenario in scenarios:
+            timings = play_timings(scenario)
+            if turn:
+                plays[scenario.name].append(timings)
+    medians, spreads = {}, {}
+    for name, timings in plays.items():
+        medians[name], spreads[name] = {}, {}
+        for metric in timings[0]:
+            values = [play[metric] for play in timings]
+            median = statistics.median(values)
+            medians[name][metric] = median
+            spreads[name][metric] = statistics.median(abs(value - median) for value in values)
+    return medians, spreads
+
+
+def measure_memory(scenario):
+    scenario.start()
+    tracemalloc.start()
+    try:
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start_blocks = sys.getallocatedblocks()
+        for index in range(scenario.frames):
+            scenario.frame(index)
+            game.run_frame()
+        blocks = sys.getallocatedblocks() - start_blocks
+        peak = tracemalloc.get_traced_memory()[1] - start_memory
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": peak / 1024, "blocks_per_frame": blocks / scenario.frames}
+
+
+def regressions(results, spreads, baseline, threshold):
+    """
+    `(scenario, metric, baseline, now)` for every metric worse than
+    `threshold` percent, than its noise floor and than NOISE times the
+    spreads of the baseline's plays and these added together.
+    """
+    found = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline["results"].get(name, {}).get(metric)
+            if before is None:
+                continue
+            higher_is_better, floor = METRICS[metric]
+            noise = NOISE * (spreads[name].get(metric, 0.0) + baseline["spreads"].get(name, {}).get(metric, 0.0))
+            worse = before - value if higher_is_better else value - before
+            if worse > max(floor, noise, abs(before) * threshold / 100):
+                found.append((name, metric, before, value))
+    return found
+
+
+def mismatched_settings(settings, baseline):
+    """ `(setting, baseline, now)` for every setting the baseline was taken with another value of. """
+    saved = baseline.get("settings", {})
+    return [(name, saved.get(name), settings[name]) for name in SETTINGS if saved.get(name) != settings[name]]
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Time the game loop in fixed scenarios.")
+    parser.add_argument("--scenario", action="append", default=None,
+                        help="only run this scenario (repeatable): idle, storm, walls, coins, gameover")
+    parser.add_argument("--frames", type=int, default=600, help="frames a gameplay scenario runs")
+    parser.add_argument("--hold", type=float, default=10.0, help="seconds the game over screen is held")
+    parser.add_argument("--repeats", type=int, default=9, help="timed plays of each scenario, the median counts")
+    parser.add_argument("--renderer", default="full", help="renderer the game draws with")
+    parser.add_argument("--backend", default="sprites", help="simulation backend")
+    parser.add_argument("--baseline", metavar="FILE", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", metavar="FILE", default=None, help="write the results to FILE")
+    parser.add_argument("--threshold", type=float, default=25.0,
+                        help="percent a metric may get worse before it counts as a regression")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    directory = tempfile.mkdtemp()  # Score files start empty, so every game over asks for initials
+    chosen = scenarios(args.frames, args.hold, directory)
+    if args.scenario:
+        unknown = set(args.scenario) - {scenario.name for scenario in chosen}
+        if unknown:
+            print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 2
+        chosen = [scenario for scenario in chosen if scenario.name in args.scenario]
+
+    init_headless()
+    scores = os.path.join(directory, "high_scores.txt")
+    game.options = game.parse_args(["--fps", "0", "--seed", str(SEED), "--renderer", args.renderer,
+                                    "--backend", args.backend, "--scores", scores])
+    game.start_up(background=False)
+    game.clock = FixedClock()
+
+    settings = {"seed": SEED, "renderer": args.renderer, "backend": args.backend,
+                "frames": args.frames, "hold": args.hold}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        mismatched = mismatched_settings(settings, baseline)
+        if mismatched:
+            changes = ", ".join(f"{name} {before} -> {now}" for name, before, now in mismatched)
+            print(f"Baseline {args.baseline} was taken with other settings ({changes}), not comparing",
+                  file=sys.stderr)
+            return 2
+
+    results, spreads = time_scenarios(chosen, args.repeats)
+    print(f"{args.renderer} renderer, {args.backend} backend, medians of {args.repeats} plays")
+    print(f"{'scenario':>9} {'frames':>7} {'fps':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'peak KiB':>9} {'blocks/frame':>13}")
+    for scenario in chosen:
+        metrics = results[scenario.name]
+        metrics.update(measure_memory(scenario))
+        print(f"{scenario.name:>9} {scenario.frames:>7} {metrics['fps']:>8.1f} {metrics['p50_ms']:>7.3f} "
+              f"{metrics['p95_ms']:>7.3f} {metrics['p99_ms']:>7.3f} {metrics['peak_kib']:>9.1f} "
+              f"{metrics['blocks_per_frame']:>13.2f}")
+
+    game.high_score_table.close()
+    game.writer.close()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump({"settings": settings, "results": results, "spreads": spreads}, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline is not None:
+        found = regressions(results, spreads, baseline, args.threshold)
+        for name, metric, before, now in found:
+            print(f"REGRESSION: {name} {metric} {before:.3f} -> {now:.3f}")
+        if found:
+            return 1
+        print(f"No regressions beyond {args.threshold:g}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""
+Cold start benchmark: time to first frame and time to playable.
+
+Each run is a fresh Python process under the SDL dummy drivers, timed from
+before pygame is imported. Two startup pipelines are compared:
+
+    eager  decode every image and sound, build the renderer, then draw the
+           first frame; the game is playable at the first frame
+    lazy   open the window and draw the loading screen first, decode on the
+           `loader.AssetLoader` thread while the renderer is built, and
+           become playable once the critical images are in
+    atlas  like lazy, but the sprites come from the prebuilt atlas in one
+           read instead of decoding and scaling each PNG (built first if
+           it is missing or stale)
+
+Both follow the steps of `ChatGPTGame.start_up()` except loading the theme
+music, which is not part of this tree.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+"""
+import time
+
+_START = time.perf_counter()
+
+import os
+import statistics
+import subprocess
+import sys
+
+
+RUNS = 5
+MODES = ("eager", "lazy", "atlas")
+
+
+def child(mode):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+
+    from assets import images, SPRITE_SPECS, CRITICAL_SPRITE_SPECS
+    from loader import AssetLoader
+    from render import RENDERERS, LoadingScreen
+    from simulation import WIDTH, HEIGHT
+    from sounds import SoundBank, SOUND_SPECS
+
+    pygame.init()
+    pygame.mixer.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+    if mode == "eager":
+        images.preload(SPRITE_SPECS)
+        SoundBank()
+        RENDERERS["full"](screen)
+        pygame.display.flip()
+        first_frame = playable = time.perf_counter()
+    else:
+        loading = LoadingScreen(screen)
+        loading.draw(0.0)
+        first_frame = time.perf_counter()
+        sounds = SoundBank(load=False)
+        loader = AssetLoader()
+        if mode == "atlas":
+            loader.add_atlas()
+        else:
+            loader.add_images(CRITICAL_SPRITE_SPECS, critical=True)
+            loader.add_images([spec for spec in SPRITE_SPECS if spec not in CRITICAL_SPRITE_SPECS])
+        loader.add_sounds(sounds, SOUND_SPECS)
+        loader.start()
+        RENDERERS["full"](screen)
+        loader.poll()
+        while not loader.critical_ready:
+            loading.draw(loader.progress, loader.last_loaded)
+            time.sleep(0.001)
+            loader.poll()
+        playable = time.perf_counter()
+
+    print(f"{first_frame - _START:.6f} {playable - _START:.6f}")
+    pygame.quit()
+
+
+def run(mode):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", mode],
+                            capture_output=True, text=True, check=True).stdout
+    first_frame, playable = output.split()[-2:]
+    return float(first_frame), float(playable)
+
+
+def main():
+    from atlas import AtlasError, build_atlas, read_index
+    try:
+        read_index()
+    except AtlasError:
+        build_atlas().save()
+
+    print(f"Median of {RUNS} cold starts")
+    print(f"{'':>6} {'first frame ms':>15} {'playable ms':>12}")
+    for mode in MODES:
+        results = [run(mode) for _ in range(RUNS)]
+        first_frame = statistics.median(result[0] for result in results)
+        playable = statistics.median(result[1] for result in results)
+        print(f"{mode:>6} {first_frame * 1000:>15.1f} {playable * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,90 @@
+"""
+Renderer check: the dirty renderer must put exactly the pixels on screen
+that the full renderer does, frame after frame.
+
+Plays games with a `bots.DodgerBot` on both backends, at 60 frames a
+second with a tick a frame and at 144 with interpolation, with the house
+dropped at the start so the 150x150 image is in play too. Every frame is
+drawn by both renderers, each onto its own surface, and the two compared
+pixel for pixel. Reports the frames and pixels that differ, and exits
+non-zero if any do.
+
+Run from the repository root:
+
+    python -m benchmarks.check_renderers
+"""
+import pygame
+
+from assets import images, SPRITE_SPECS
+from bots import DodgerBot
+from fallingarray import KIND_HOUSE
+from inputs import ScriptedInput
+from render import Renderer, DirtyRenderer
+from simulation import Simulation, WIDTH, HEIGHT, init_headless
+
+
+SEEDS = [1, 2, 3]
+SECONDS = 10
+RATES = [(60, False), (144, True)]  # Frames a second, interpolation
+
+
+def differing_pixels(surface, other):
+    """ How many pixels of the two surfaces differ, without needing NumPy. """
+    difference = surface.copy()
+    difference.blit(other, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+    reverse = other.copy()
+    reverse.blit(surface, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+    difference.blit(reverse, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+    same = pygame.mask.from_threshold(difference, (0, 0, 0), (1, 1, 1, 255)).count()
+    return WIDTH * HEIGHT - same
+
+
+def play(seed, backend, rate, interpolate):
+    """ Frames played, frames that differed and the total differing pixels. """
+    sim = Simulation(seed, backend)
+    sim.interpolate = interpolate
+    sim.input_provider = ScriptedInput(DodgerBot(seed))
+    sim.spawn_falling(KIND_HOUSE)
+    full = Renderer(pygame.Surface((WIDTH, HEIGHT)).convert())
+    dirty = DirtyRenderer(pygame.Surface((WIDTH, HEIGHT)).convert())
+
+    frames = bad_frames = bad_pixels = 0
+    for _ in range(SECONDS * rate):
+        sim.step(dt=1 / rate)
+        for renderer in (full, dirty):
+            renderer.draw(sim)
+            renderer.draw_hud(sim)
+            renderer.present()
+        different = differing_pixels(full.screen, dirty.screen)
+        frames += 1
+        bad_frames += different > 0
+        bad_pixels += different
+        if sim.game_over:
+            break
+    return frames, bad_frames, bad_pixels
+
+
+def main():
+    init_headless()
+    pygame.font.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    images.preload(SPRITE_SPECS)
+
+    print(f"{'seed':>4} {'backend':>8} {'rate':>5} {'interp':>6} {'frames':>7} {'differ':>7} {'pixels':>8}")
+    failures = 0
+    for seed in SEEDS:
+        for backend in ("sprites", "numpy"):
+            for rate, interpolate in RATES:
+                frames, bad_frames, bad_pixels = play(seed, backend, rate, interpolate)
+                failures += bad_frames
+                print(f"{seed:>4} {backend:>8} {rate:>5} {'on' if interpolate else 'off':>6} "
+                      f"{frames:>7} {bad_frames:>7} {bad_pixels:>8}")
+
+    if failures:
+        print(f"MISMATCH: {failures} frames drawn differently by the two renderers")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
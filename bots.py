@@ -0,0 +1,121 @@
+import random
+
+from fallingarray import KIND_MONEY, KIND_DOCUMENTS, KIND_POWERUP
+from simulation import WIDTH, INPUT_LEFT, INPUT_RIGHT, INPUT_SHOOT, INPUT_BUILD
+
+
+"""
+BOTS
+
+A bot is a policy for headless runs: called as `bot(sim)` before every tick,
+it returns that tick's input bitmask. Bots are built per game with the
+game's seed, and any randomness they need comes from their own generator,
+so they never disturb the simulation's random numbers.
+"""
+
+class IdleBot:
+    """ Stands still. The baseline every other bot should beat. """
+
+    def __init__(self, seed=None):
+        pass
+
+    def __call__(self, sim):
+        return 0
+
+
+class RandomBot:
+    """ Holds a random direction for a random while, and shoots now and then. """
+
+    def __init__(self, seed=None, shoot_chance=0.1, build_chance=0.02):
+        self.random = random.Random(seed)
+        self.shoot_chance = shoot_chance
+        self.build_chance = build_chance
+        self.inputs = 0
+        self.hold = 0
+
+    def __call__(self, sim):
+        if self.hold <= 0:
+            self.hold = self.random.randint(5, 30)
+            self.inputs = self.random.choice((0, INPUT_LEFT, INPUT_RIGHT))
+            if self.random.random() < self.shoot_chance:
+                self.inputs |= INPUT_SHOOT
+            if sim.player.powerup_count > 0 and self.random.random() < self.build_chance:
+                self.inputs |= INPUT_BUILD
+        self.hold -= 1
+        return self.inputs
+
+
+class DodgerBot:
+    """
+    Scripted player. Every tick it looks `horizon` ticks ahead and picks the
+    move (left, stay or right) that keeps it clear of documents the
+    longest. With time to spare it goes after money and power-ups; when a
+    hit is close whichever way it moves, it shoots, or walls off the screen
+    if it has a power-up to spend.
+    """
+
+    MOVES = ((0, 0), (INPUT_LEFT, -1), (INPUT_RIGHT, 1))
+
+    def __init__(self, seed=None, horizon=40, panic_ticks=10):
+        self.horizon = horizon
+        self.panic_ticks = panic_ticks  # Shoot or build once a hit is this close
+        self.pressed = 0
+
+    def __call__(self, sim):
+        player = sim.player.rect
+        speed = sim.player.speed
+
+        documents = []
+        target = None  # Centre x of the closest money or power-up above us
+        closest = None
+        for kind, x, y, w, h, fall in sim.falling_state():
+            if y >= player.bottom:
+                continue
+            if kind == KIND_DOCUMENTS:
+                documents.append((x, y, w, h, max(fall, 1)))
+            elif kind in (KIND_MONEY, KIND_POWERUP):
+                distance = abs(x + w / 2 - player.centerx) + (player.top - y)
+                if closest is None or distance < closest:
+                    closest = distance
+                    target = x + w / 2
+
+        # Ticks until the first hit for each move; horizon + 1 means none in sight
+        clear = {inputs: self.first_hit(documents, player, dx * speed) for inputs, dx in self.MOVES}
+        safest = max(clear.values())
+        safe = [inputs for inputs, _ in self.MOVES if clear[inputs] == safest]
+
+        inputs = safe[0]
+        if target is not None and len(safe) > 1:
+            toward = INPUT_LEFT if target < player.centerx - speed else INPUT_RIGHT if target > player.centerx + speed else 0
+            if toward in safe:
+                inputs = toward
+
+        if safest <= self.panic_ticks:
+            inputs |= INPUT_BUILD if sim.player.powerup_count > 0 else INPUT_SHOOT
+
+        # Shooting and building fire on the press, so let go in between
+        inputs &= ~(self.pressed & (INPUT_SHOOT | INPUT_BUILD))
+        self.pressed = inputs
+        return inputs
+
+    def first_hit(self, documents, player, dx):
+        """ Ticks until a document lands on the player if it keeps moving by `dx` a tick. """
+        best = self.horizon + 1
+        left_limit = WIDTH - player.width
+        for x, y, w, h, fall in documents:
+            # Ticks during which the document overlaps the player's rows
+            start = max(1, (player.top - y - h) // fall + 1)
+            end = min(best - 1, (player.bottom - y - 1) // fall)
+            for t in range(start, end + 1):
+                px = min(max(player.x + dx * t, 0), left_limit)
+                if px < x + w and px + player.width > x:
+                    best = t
+                    break
+        return best
+
+
+BOTS = {
+    "idle": IdleBot,
+    "random": RandomBot,
+    "dodger": DodgerBot,
+}
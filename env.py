@@ -0,0 +1,84 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only agents need it
+    np = None
+
+from inputs import AgentInput
+from observation import OBSERVATION_SIZE, observe
+from simulation import Simulation
+
+
+"""
+BATCHED GAMES
+"""
+
+class BatchEnv:
+    """
+    Many headless games stepped in lockstep, for evaluating agents.
+
+    `step_batch(actions)` gives game `i` the input bitmask `actions[i]`
+    through its `AgentInput`, runs one tick of every game and returns
+    `(observations, rewards, dones)`: an array of shape
+    `(count, OBSERVATION_SIZE)`, the score each game gained this tick, and
+    which games ended this tick. A game also ends once it has run
+    `max_ticks`. Games that end start over straight away with the next
+    seed, so the batch never shrinks; their results go to `episodes`.
+
+    The returned arrays are reused on every call, copy them to keep them.
+    """
+
+    def __init__(self, count, seed=0, backend="numpy", schedule=None, max_ticks=None):
+        if np is None:
+            raise RuntimeError("BatchEnv needs NumPy installed")
+        self.max_ticks = max_ticks
+        self.next_seed = seed
+        self.providers = [AgentInput() for _ in range(count)]
+        self.sims = []
+        for provider in self.providers:
+            sim = Simulation(self._take_seed(), backend, schedule=schedule)
+            sim.input_provider = provider
+            self.sims.append(sim)
+        self.observations = np.zeros((count, OBSERVATION_SIZE), dtype=np.float32)
+        self.rewards = np.zeros(count, dtype=np.float32)
+        self.dones = np.zeros(count, dtype=bool)
+        self.episodes = []  # {"seed", "score", "level", "ticks", "win"} of every game that ended
+        self.steps = 0
+
+    def __len__(self):
+        return len(self.sims)
+
+    def _take_seed(self):
+        seed = self.next_seed
+        self.next_seed += 1
+        return seed
+
+    def reset(self):
+        """ Starts every game over with fresh seeds and returns the observations. """
+        for i, sim in enumerate(self.sims):
+            sim.reset(self._take_seed())
+            observe(sim, self.observations[i])
+        return self.observations
+
+    def observe(self):
+        for i, sim in enumerate(self.sims):
+            observe(sim, self.observations[i])
+        return self.observations
+
+    def step_batch(self, actions):
+        rewards = self.rewards
+        dones = self.dones
+        for i, (sim, provider) in enumerate(zip(self.sims, self.providers)):
+            player = sim.player
+            score = player.score
+            provider.action = int(actions[i])
+            sim.tick()
+            rewards[i] = player.score - score
+            done = sim.game_over or (self.max_ticks is not None and sim.ticks >= self.max_ticks)
+            dones[i] = done
+            if done:
+                self.episodes.append({"seed": sim.seed, "score": player.score, "level": sim.level,
+                                      "ticks": sim.ticks, "win": sim.win and sim.game_over})
+                sim.reset(self._take_seed())
+            observe(sim, self.observations[i])
+        self.steps += 1
+        return self.observations, rewards, dones
@@ -0,0 +1,203 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the "numpy" backend needs it
+    np = None
+
+from assets import images
+
+
+"""
+CONSTANTS
+"""
+# Falling object kinds, shared by the sprite and the array backends
+KIND_MONEY = 0
+KIND_DOCUMENTS = 1
+KIND_POWERUP = 2
+KIND_HOUSE = 3
+
+# Collision size of each kind. The house keeps the 40x40 rect it has always
+# had, even though it is drawn at 150x150.
+KIND_SIZE = {
+    KIND_MONEY: (40, 40),
+    KIND_DOCUMENTS: (40, 40),
+    KIND_POWERUP: (40, 40),
+    KIND_HOUSE: (40, 40),
+}
+
+# Image drawn for each kind
+KIND_IMAGE = {
+    KIND_MONEY: ("money.png", (40, 40)),
+    KIND_DOCUMENTS: ("documents.png", (40, 40)),
+    KIND_POWERUP: ("coin.png", (40, 40)),
+    KIND_HOUSE: ("house.png", (150, 150)),
+}
+
+# Collision mask of each kind: its image at its collision size. The house's
+# collision rect is only the corner of its drawn image, so it keeps the
+# plain rect test.
+KIND_MASK = {
+    KIND_MONEY: ("money.png", (40, 40)),
+    KIND_DOCUMENTS: ("documents.png", (40, 40)),
+    KIND_POWERUP: ("coin.png", (40, 40)),
+    KIND_HOUSE: None,
+}
+
+
+"""
+FALLING OBJECT ARRAY
+"""
+
+class FallingArray:
+    """
+    Structure-of-arrays store for falling objects.
+
+    Instead of one `pygame.sprite.Sprite` per object, positions, speeds and
+    kinds live in parallel NumPy arrays. Moving, culling and collision
+    testing are each a handful of vectorized operations over the whole
+    population, so the cost per tick barely grows with the object count.
+
+    Live objects are always packed into the first `count` slots, in the
+    order they were spawned. `prev_y` holds where each one was before the
+    last `advance()`, for drawing between ticks.
+    """
+
+    def __init__(self, height, capacity=256):
+        if np is None:
+            raise RuntimeError("The numpy backend needs NumPy installed")
+        self.height = height
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.prev_y = np.zeros(capacity, dtype=np.int32)
+        self.w = np.zeros(capacity, dtype=np.int32)
+        self.h = np.zeros(capacity, dtype=np.int32)
+        self.speed = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, kind, x, y, speed):
+        if self.count == len(self.x):
+            self._grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.prev_y[i] = y
+        self.w[i], self.h[i] = KIND_SIZE[kind]
+        self.speed[i] = speed
+        self.kind[i] = kind
+        self.count += 1
+
+    def advance(self):
+        """ Moves every object down by its speed and drops the ones below the screen. """
+        n = self.count
+        if not n:
+            return
+        y = self.y[:n]
+        kind = self.kind[:n]
+        self.prev_y[:n] = y
+
+        # The house stops half way down the screen, everything else keeps falling
+        moving = (kind != KIND_HOUSE) | (y < self.height / 2)
+        y += np.where(moving, self.speed[:n], 0).astype(np.int32)
+
+        gone = y > self.height
+        if gone.any():
+            self.remove(gone)
+
+    def overlapping(self, rect, kind=None):
+        """
+        Returns a boolean mask over the live objects that overlap `rect`,
+        optionally only those of `kind`. Same rules as `Rect.colliderect()`.
+        """
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        mask = ((x < rect.right) & (x + self.w[:n] > rect.left)
+                & (y < rect.bottom) & (y + self.h[:n] > rect.top))
+        if kind is not None:
+            mask &= self.kind[:n] == kind
+        return mask
+
+    def overlapping_rects(self, rects, kind=None):
+        """
+        Batched `overlapping()`: returns a boolean matrix with a row for each
+        of `rects` and a column for each live object.
+        """
+        n = self.count
+        bounds = np.array([(rect.left, rect.top, rect.right, rect.bottom) for rect in rects], dtype=np.int32)
+        left, top, right, bottom = (bounds[:, i:i + 1] for i in range(4))
+        x = self.x[:n]
+        y = self.y[:n]
+        mask = (x < right) & (x + self.w[:n] > left) & (y < bottom) & (y + self.h[:n] > top)
+        if kind is not None:
+            mask &= self.kind[:n] == kind
+        return mask
+
+    def touching(self, rect, mask, kind=None):
+        """
+        `overlapping()` narrowed down to the objects whose collision mask
+        touches `mask` placed at `rect`, like `collision.touching()`.
+        """
+        return self.narrow(self.overlapping(rect, kind), rect, mask)
+
+    def narrow(self, hits, rect, mask):
+        """
+        Clears, in place, the entries of `hits` (a row of `overlapping()` or
+        `overlapping_rects()` for `rect`) whose masks miss `mask` placed at
+        `rect`. Only the objects whose rects overlap get their masks compared.
+        """
+        for i in hits.nonzero()[0].tolist():
+            if not self._touches(i, rect, mask):
+                hits[i] = False
+        return hits
+
+    def _touches(self, i, rect, mask):
+        spec = KIND_MASK[int(self.kind[i])]
+        if mask is None or spec is None:
+            return True
+        return mask.overlap(images.mask(*spec), (int(self.x[i]) - rect.x, int(self.y[i]) - rect.y)) is not None
+
+    def remove(self, mask):
+        """ Removes the objects selected by `mask`, keeping the rest in order. """
+        n = self.count
+        keep = ~mask
+        m = int(keep.sum())
+        for array in (self.x, self.y, self.prev_y, self.w, self.h, self.speed, self.kind):
+            array[:m] = array[:n][keep]
+        self.count = m
+
+    def kinds(self, mask):
+        return self.kind[:self.count][mask].tolist()
+
+    def drawn_y(self, alpha=1.0):
+        """ The live objects' y, `alpha` of the way from `prev_y` to `y`, as a list. """
+        n = self.count
+        if alpha >= 1:
+            return self.y[:n].tolist()
+        prev_y = self.prev_y[:n]
+        return np.rint(prev_y + (self.y[:n] - prev_y) * alpha).astype(np.int32).tolist()
+
+    def draw(self, surface, alpha=1.0):
+        n = self.count
+        if not n:
+            return
+        kinds = self.kind[:n].tolist()
+        # Only look up kinds on screen; the house image may still be loading
+        kind_images = {kind: images.get(*KIND_IMAGE[kind]) for kind in set(kinds)}
+        surface.blits([
+            (kind_images[kind], (x, y))
+            for kind, x, y in zip(kinds, self.x[:n].tolist(), self.drawn_y(alpha))
+        ], doreturn=False)
+
+    def clear(self):
+        self.count = 0
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in ("x", "y", "prev_y", "w", "h", "speed", "kind"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
@@ -0,0 +1,135 @@
+import bisect
+import itertools
+import os
+import stat
+import tempfile
+
+
+"""
+HIGH SCORE TABLE
+"""
+
+class HighScoreTable:
+    """
+    In-memory high score table backed by a plain `score,initials` text file.
+
+    The file is read once, when the table is created. After that the table
+    answers every question from memory and only writes the file back when
+    an entry actually changes it. Writes go to a temporary file which is
+    then renamed over the real one, so a crash mid-write can never leave a
+    half-written table behind. Given a `writer.BackgroundWriter`, the
+    table hands it the writes instead of making them itself, and saves
+    that pile up while the disk is busy collapse into one.
+
+    Entries are kept sorted best-first. Equal scores keep the order they
+    were added in, so an older entry stays ahead of a newer one.
+    """
+
+    def __init__(self, path="high_scores.txt", max_entries=100, display_count=5, writer=None):
+        self.path = path
+        self.writer = writer
+        self.max_entries = max_entries
+        self.display_count = display_count
+
+        # Sorted list of (-score, sequence, initials)
+        self._entries = []
+        self._sequence = itertools.count()
+        self._top = None
+        self.load()
+
+    def load(self):
+        """ (Re)reads the table from disk. A missing file is an empty table. """
+        self._entries = []
+        try:
+            with open(self.path, "r") as file:
+                for line in file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    score, initials = line.split(",")
+                    self._entries.append((-int(score), next(self._sequence), initials.upper()))
+        except FileNotFoundError:
+            pass
+        self._entries.sort()
+        del self._entries[self.max_entries:]
+        self._top = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def top(self, count=None):
+        """ Returns the best `count` entries as `{"score", "initials"}` dicts. """
+        count = self.display_count if count is None else count
+        if count == self.display_count:
+            if self._top is None:
+                self._top = self._as_dicts(self._entries[:count])
+            return self._top
+        return self._as_dicts(self._entries[:count])
+
+    def rank(self, score):
+        """ Returns the 1-based rank a new entry with `score` would get. """
+        return bisect.bisect_right(self._entries, (-score, float("inf"))) + 1
+
+    def qualifies(self, score, count=None):
+        """ Returns True if `score` would make it into the top `count` entries. """
+        count = self.display_count if count is None else count
+        if len(self._entries) < count:
+            return True
+        return score > -self._entries[count - 1][0]
+
+    def record_run(self, score, level, duration):
+        """ The text file only keeps named high scores, so finished runs are not recorded. """
+        return None
+
+    def add(self, score, initials, run=None):
+        """
+        Adds an entry and saves the table if it changed. `run` is whatever
+        `record_run()` returned for this score; the text table has no use
+        for it.
+
+        Returns the new entry's rank, or None if it did not make the table.
+        """
+        if len(self._entries) >= self.max_entries and not self.qualifies(score, self.max_entries):
+            return None
+
+        rank = self.rank(score)
+        bisect.insort(self._entries, (-score, next(self._sequence), initials.upper()))
+        del self._entries[self.max_entries:]
+        self._top = None
+        self.save()
+        return rank
+
+    def save(self):
+        """ Rewrites the file with the current table, through the writer if there is one. """
+        if self.writer is not None:
+            self.writer.submit(self.write_file, self.path, self.serialize(), key=("high scores", self.path))
+        else:
+            self.write_file(self.path, self.serialize())
+
+    @staticmethod
+    def write_file(path, text):
+        """ Atomically replaces the file at `path` with `text`. """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".high_scores.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(path):
+                # mkstemp() makes the file private; keep the permissions the scores file had
+                os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def close(self):
+        """ Nothing to do; `add()` has saved every change, or queued it with the writer's owner to flush. """
+
+    def serialize(self):
+        return "".join(f"{-score},{initials}\n" for score, _, initials in self._entries)
+
+    @staticmethod
+    def _as_dicts(entries):
+        return [{"score": -score, "initials": initials} for score, _, initials in entries]
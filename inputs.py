@@ -0,0 +1,334 @@
+import json
+import time
+from collections import deque
+
+import pygame
+
+from observation import observe
+from profiling import NullProfiler
+from simulation import (inputs_from_keys, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+                        INPUT_SHOOT, INPUT_BUILD)
+
+
+"""
+INPUT PROVIDERS
+
+Something that decides what the player does. A `Simulation` with an
+`input_provider` asks it for the input bitmask of every tick it runs
+without being handed inputs explicitly, and `Player.update()` acts on
+that bitmask. Swapping the provider swaps a human for a script or an AI
+without touching the game.
+"""
+
+class InputProvider:
+    """ Base class. `get_inputs(sim)` returns the input bitmask for the next tick. """
+
+    def get_inputs(self, sim):
+        return 0
+
+    def reset(self):
+        """ Called when the simulation starts a new game. """
+
+
+class KeyboardInput(InputProvider):
+    """
+    The keys held down right now: arrows to move, A to shoot, B to build.
+    Polling misses taps that start and end between two ticks; the game
+    uses `ActionInput` instead.
+    """
+
+    def get_inputs(self, sim):
+        return inputs_from_keys(pygame.key.get_pressed())
+
+
+class ScriptedInput(InputProvider):
+    """
+    Plays back a script: either a sequence of input bitmasks, one per tick
+    (e.g. `replay.Replay.inputs`), or a policy called as `policy(sim)`, such
+    as one of the bots in `bots.py`. A sequence that runs out leaves the
+    player idle.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.position = 0
+
+    def get_inputs(self, sim):
+        if callable(self.script):
+            return self.script(sim)
+        if self.position >= len(self.script):
+            return 0
+        inputs = self.script[self.position]
+        self.position += 1
+        return inputs
+
+    def reset(self):
+        self.position = 0
+
+
+class AgentInput(InputProvider):
+    """
+    Input chosen by an agent from observations.
+
+    With an `agent`, every tick calls `agent(observation)` with the
+    fixed-shape array from `observation.observe()` and uses the bitmask it
+    returns. Without one, whatever was last put in `action` is used; this
+    is how `env.BatchEnv` drives many games in lockstep.
+    """
+
+    def __init__(self, agent=None):
+        self.agent = agent
+        self.action = 0
+        self._observation = None
+
+    def get_inputs(self, sim):
+        if self.agent is not None:
+            self._observation = observe(sim, self._observation)
+            self.action = int(self.agent(self._observation))
+        return self.action
+
+    def reset(self):
+        self.action = 0
+
+
+"""
+ACTIONS
+
+Keys and gamepad controls are bound to named actions. The gameplay actions
+set input bits; the others drive the menus and the initials entry.
+"""
+
+ACTION_BITS = {
+    "left": INPUT_LEFT,
+    "right": INPUT_RIGHT,
+    "up": INPUT_UP,
+    "down": INPUT_DOWN,
+    "shoot": INPUT_SHOOT,
+    "build": INPUT_BUILD,
+}
+MENU_ACTIONS = ("confirm", "erase", "restart", "overlay")
+ACTIONS = tuple(ACTION_BITS) + MENU_ACTIONS
+
+DEFAULT_KEYS = {
+    pygame.K_LEFT: "left",
+    pygame.K_RIGHT: "right",
+    pygame.K_UP: "up",
+    pygame.K_DOWN: "down",
+    pygame.K_a: "shoot",
+    pygame.K_b: "build",
+    pygame.K_RETURN: "confirm",
+    pygame.K_KP_ENTER: "confirm",
+    pygame.K_BACKSPACE: "erase",
+    pygame.K_SPACE: "restart",
+    pygame.K_F3: "overlay",
+}
+
+# Joystick button numbers of an Xbox style pad: A, B, X, Back, Start
+DEFAULT_BUTTONS = {
+    0: "shoot",
+    1: "build",
+    2: "erase",
+    6: "restart",
+    7: "confirm",
+}
+
+# The left stick and the d-pad move. A stick counts once pushed past the dead zone.
+STICK_AXES = {0: ("left", "right"), 1: ("up", "down")}
+STICK_DEAD_ZONE = 0.5
+
+
+class BindingsError(ValueError):
+    """ Raised for bindings files with unknown keys or actions. """
+
+
+class Bindings:
+    """
+    Which key and which gamepad button triggers which action.
+
+    A bindings file is JSON with key names as `pygame.key.name()` gives
+    them and button numbers, either section replacing the defaults:
+
+        {"keys": {"left": "left", "z": "shoot", "x": "build"}, "buttons": {"0": "shoot"}}
+    """
+
+    def __init__(self, keys=None, buttons=None):
+        self.keys = dict(DEFAULT_KEYS if keys is None else keys)
+        self.buttons = dict(DEFAULT_BUTTONS if buttons is None else buttons)
+
+    def rebind_key(self, action, key):
+        """ Makes `key` the one key for `action`. """
+        self.keys = {bound: name for bound, name in self.keys.items() if name != action}
+        self.keys[key] = action
+
+    def rebind_button(self, action, button):
+        """ Makes `button` the one gamepad button for `action`. """
+        self.buttons = {bound: name for bound, name in self.buttons.items() if name != action}
+        self.buttons[button] = action
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            try:
+                data = json.load(file)
+            except ValueError as error:
+                raise BindingsError(f"{path} is not valid JSON: {error}") from None
+        keys = buttons = None
+        if "keys" in data:
+            keys = {}
+            for name, action in data["keys"].items():
+                key = pygame.key.key_code(name)
+                if key == pygame.K_UNKNOWN:
+                    raise BindingsError(f"Unknown key {name!r} in {path}")
+                keys[key] = _check_action(action, path)
+        if "buttons" in data:
+            buttons = {int(button): _check_action(action, path) for button, action in data["buttons"].items()}
+        return cls(keys, buttons)
+
+    def save(self, path):
+        data = {
+            "keys": {pygame.key.name(key): action for key, action in self.keys.items()},
+            "buttons": {str(button): action for button, action in self.buttons.items()},
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
+
+
+def _check_action(action, path):
+    if action not in ACTIONS:
+        raise BindingsError(f"Unknown action {action!r} in {path}")
+    return action
+
+
+class ActionEvent:
+    """
+    One press or release of an action, with the `time.perf_counter()` it was
+    read at and whether a gamepad rather than the keyboard sent it.
+    """
+
+    __slots__ = ("action", "pressed", "time", "text", "gamepad")
+
+    def __init__(self, action, pressed, time, text="", gamepad=False):
+        self.action = action  # None for keys bound to nothing, which may still type `text`
+        self.pressed = pressed
+        self.time = time
+        self.text = text
+        self.gamepad = gamepad
+
+    def __repr__(self):
+        return f"ActionEvent({self.action!r}, {'press' if self.pressed else 'release'}, {self.time:.4f})"
+
+
+class ActionInput(InputProvider):
+    """
+    Event-driven input for the game, from the keyboard and any gamepads.
+
+    The game loop drains the pygame event queue once a frame and passes
+    every event to `handle()`, which turns bound keys, buttons, d-pads and
+    sticks into `ActionEvent`s. Gameplay presses and releases are buffered
+    until the simulation asks for a tick's inputs: each tick takes the
+    buffered edges in order, but at most one edge per action, so a tap
+    that starts and ends within one frame still holds its bit for a whole
+    tick and two quick taps make two presses, however the ticks fall
+    across frames.
+
+    Presses, with any text their key types, also go to the menu queue read
+    by `take_menu_events()`, which the game over screen and the initials
+    entry use.
+
+    The time from reading a gameplay press to the tick that acts on it is
+    reported to `profiler.add_latency()`.
+    """
+
+    def __init__(self, bindings=None, profiler=None):
+        self.bindings = bindings or Bindings()
+        self.profiler = profiler or NullProfiler()
+        self.held = 0  # Input bits of the gameplay actions held down, as of the last tick
+        self.joysticks = {}  # Instance id -> open `pygame.joystick.Joystick`
+        self._edges = deque()  # Gameplay `ActionEvent`s not yet taken by a tick
+        self._menu = []
+        self._sticks = {}  # (instance id, "axis"/"hat", axis) -> action held by that stick, or None
+
+    def handle(self, event):
+        """ Turns one pygame event into action events, if anything is bound to it. """
+        now = time.perf_counter()
+        kind = event.type
+        if kind == pygame.KEYDOWN:
+            self._push(self.bindings.keys.get(event.key), True, now, getattr(event, "unicode", ""))
+        elif kind == pygame.KEYUP:
+            self._push(self.bindings.keys.get(event.key), False, now)
+        elif kind == pygame.JOYBUTTONDOWN:
+            self._push(self.bindings.buttons.get(event.button), True, now, gamepad=True)
+        elif kind == pygame.JOYBUTTONUP:
+            self._push(self.bindings.buttons.get(event.button), False, now, gamepad=True)
+        elif kind == pygame.JOYAXISMOTION:
+            actions = STICK_AXES.get(event.axis)
+            if actions is not None:
+                direction = actions[0] if event.value < -STICK_DEAD_ZONE else actions[1] if event.value > STICK_DEAD_ZONE else None
+                self._move_stick((event.instance_id, "axis", event.axis), direction, now)
+        elif kind == pygame.JOYHATMOTION:
+            x, y = event.value
+            self._move_stick((event.instance_id, "hat", 0), {-1: "left", 1: "right"}.get(x), now)
+            self._move_stick((event.instance_id, "hat", 1), {1: "up", -1: "down"}.get(y), now)
+        elif kind == pygame.JOYDEVICEADDED:
+            joystick = pygame.joystick.Joystick(event.device_index)
+            self.joysticks[joystick.get_instance_id()] = joystick
+        elif kind == pygame.JOYDEVICEREMOVED:
+            self.joysticks.pop(event.instance_id, None)
+            for key in [key for key in self._sticks if key[0] == event.instance_id]:
+                self._move_stick(key, None, now)
+
+    def take_menu_events(self):
+        """ Returns the presses since the last call, oldest first. """
+        events = self._menu
+        self._menu = []
+        return events
+
+    def get_inputs(self, sim):
+        edges = self._edges
+        inputs = self.held
+        changed = 0
+        now = None
+        while edges:
+            event = edges[0]
+            bit = ACTION_BITS[event.action]
+            if changed & bit:
+                break  # This action already changed this tick; the rest wait for the next one
+            if event.pressed:
+                inputs |= bit
+                if now is None:
+                    now = time.perf_counter()
+                self.profiler.add_latency(event.time, now - event.time)
+            else:
+                inputs &= ~bit
+            changed |= bit
+            edges.popleft()
+        self.held = inputs
+        return inputs
+
+    def reset(self):
+        # Keys pressed or let go between games still count for what is held
+        for event in self._edges:
+            if event.pressed:
+                self.held |= ACTION_BITS[event.action]
+            else:
+                self.held &= ~ACTION_BITS[event.action]
+        self._edges.clear()
+
+    def _push(self, action, pressed, now, text="", gamepad=False):
+        if action is None and not text:
+            return
+        event = ActionEvent(action, pressed, now, text, gamepad)
+        if action in ACTION_BITS:
+            self._edges.append(event)
+        if pressed:
+            self._menu.append(event)
+
+    def _move_stick(self, key, action, now):
+        held = self._sticks.get(key)
+        if action == held:
+            return
+        if held is not None:
+            self._push(held, False, now, gamepad=True)
+        if action is not None:
+            self._push(action, True, now, gamepad=True)
+        self._sticks[key] = action
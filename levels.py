@@ -0,0 +1,149 @@
+import json
+import math
+
+from assets import asset_path
+
+
+"""
+LEVEL TABLES
+
+A level table is a JSON file listing every level of a run in order:
+
+    {
+      "name": "classic",
+      "levels": [
+        {"name": "Warm Up Mode", "start": 0, "spawns_per_second": 1.8, "documents": 50, "max_fall_speed": 300},
+        ...
+        {"name": "...", "start": 191, "spawns_per_second": 0, "documents": 0, "max_fall_speed": 600, "house": true}
+      ]
+    }
+
+    start              seconds into the run at which the level begins
+    spawns_per_second  average number of money or documents objects spawned a second
+    documents          percent of those spawns that are documents
+    max_fall_speed     money and documents fall at a random speed up to this, in pixels a second
+    house              optional; the house drops when this level begins
+
+Everything is in seconds so a table means the same at any tick rate.
+Compiling it for a tick rate turns the rates into what a tick needs: a
+whole percent chance of a spawn each tick and a speed cap in whole pixels
+a tick.
+
+The first level has to start at 0 and starts may not go backwards. A
+different file gives a different difficulty curve without touching code.
+"""
+
+DEFAULT_LEVELS = "levels.json"
+
+
+class LevelTableError(ValueError):
+    """ Raised for level tables that are missing fields or out of order. """
+
+
+class Level:
+    """
+    One row of a level table compiled for a tick rate: `start_tick`,
+    `spawn_chance` (percent a tick) and `speed_cap` (pixels a tick).
+    """
+
+    __slots__ = ("index", "name", "start_tick", "spawn_chance", "documents", "speed_cap", "house")
+
+    def __init__(self, index, name, start_tick, spawn_chance, documents, speed_cap, house=False):
+        self.index = index
+        self.name = name
+        self.start_tick = start_tick
+        self.spawn_chance = spawn_chance
+        self.documents = documents
+        self.speed_cap = speed_cap
+        self.house = house
+
+    def __repr__(self):
+        return f"Level({self.index}, {self.name!r}, start_tick={self.start_tick})"
+
+
+class LevelSchedule:
+    """
+    A level table compiled for a given tick rate.
+
+    `levels[i]` is level `i`. `level_at(tick)` looks the level up in a table
+    with one entry per tick, up to the start of the last level. The
+    simulation itself only ever moves forward a level at a time, using
+    `next_start()`.
+    """
+
+    def __init__(self, levels, tick_rate, name=""):
+        if not 0 < len(levels) < 256:
+            raise LevelTableError("A level table needs between 1 and 255 levels")
+        self.name = name
+        self.tick_rate = tick_rate
+        self.levels = []
+        for index, row in enumerate(levels):
+            try:
+                level = Level(index, row.get("name", f"Level {index}"),
+                              round(row["start"] * tick_rate),
+                              round(row["spawns_per_second"] * 100 / tick_rate),
+                              int(row["documents"]),
+                              round(row["max_fall_speed"] / tick_rate),
+                              bool(row.get("house", False)))
+            except (KeyError, TypeError, ValueError) as error:
+                raise LevelTableError(f"Level {index} is malformed: {error!r}") from None
+            if not 0 <= level.spawn_chance <= 100:
+                raise LevelTableError(f"Level {index} spawns more than once a tick at {tick_rate} ticks a second")
+            if level.speed_cap < 1:
+                raise LevelTableError(f"Level {index} falls slower than a pixel a tick at {tick_rate} ticks a second")
+            if index == 0 and level.start_tick != 0:
+                raise LevelTableError("The first level has to start at 0")
+            if index and level.start_tick < self.levels[-1].start_tick:
+                raise LevelTableError(f"Level {index} starts before level {index - 1}")
+            self.levels.append(level)
+
+        # Level of every tick up to the last level's start; later ticks are all the last level
+        last = self.levels[-1].start_tick
+        table = bytearray(last + 1)
+        for level in self.levels[1:]:
+            table[level.start_tick:] = bytes([level.index]) * (last + 1 - level.start_tick)
+        self._tick_levels = bytes(table)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def level_at(self, tick):
+        """ The level index in force `tick` ticks into the run. """
+        if tick < len(self._tick_levels):
+            return self._tick_levels[tick]
+        return len(self.levels) - 1
+
+    def next_start(self, index):
+        """ Tick at which the level after `index` starts, or infinity after the last one. """
+        if index + 1 < len(self.levels):
+            return self.levels[index + 1].start_tick
+        return math.inf
+
+    @classmethod
+    def from_dict(cls, data, tick_rate):
+        try:
+            levels = data["levels"]
+        except (KeyError, TypeError):
+            raise LevelTableError("A level table needs a \"levels\" list") from None
+        return cls(levels, tick_rate, data.get("name", ""))
+
+
+_schedules = {}
+
+
+def load_schedule(path=None, tick_rate=60):
+    """
+    Loads and compiles the level table at `path`, `levels.json` by default.
+    Tables are compiled once per path and tick rate and then shared.
+    """
+    path = path or asset_path(DEFAULT_LEVELS)
+    key = (path, tick_rate)
+    schedule = _schedules.get(key)
+    if schedule is None:
+        with open(path) as file:
+            try:
+                data = json.load(file)
+            except ValueError as error:
+                raise LevelTableError(f"{path} is not valid JSON: {error}") from None
+        schedule = _schedules[key] = LevelSchedule.from_dict(data, tick_rate)
+    return schedule
@@ -0,0 +1,124 @@
+import queue
+import sys
+import threading
+
+from assets import images, decode_image
+from atlas import ATLAS_FILE, Atlas
+from audiocache import cached_audio
+from sounds import THEME_FILE, decode_sound
+
+
+"""
+BACKGROUND ASSET LOADER
+"""
+
+class AssetLoader:
+    """
+    Decodes images and sounds on a worker thread while the game shows its
+    loading screen.
+
+    Each job has a decode step, run on the worker, and an install step, run
+    on the main thread by `poll()` once the decoded asset is on the ready
+    queue. Installing is where surfaces get converted to the display format,
+    which has to happen on the thread that owns the window. Critical jobs
+    are decoded first; `critical_ready` turns true once all of them are
+    installed, and the rest keep loading while the game runs.
+
+    With `background=False` every job is decoded and installed in `start()`,
+    the way the game used to load before its first frame.
+    """
+
+    def __init__(self, background=True):
+        self.background = background
+        self.jobs = []
+        self.ready = queue.Queue()
+        self.loaded = 0
+        self.critical_left = 0
+        self.errors = []
+        self.last_loaded = None
+        self._thread = None
+
+    def add(self, name, decode, install, critical=False):
+        """ Queues a job: `install(decode())`, named `name` for progress reports. """
+        self.jobs.append((name, decode, install, critical))
+        if critical:
+            self.critical_left += 1
+
+    def add_images(self, specs, critical=False):
+        for path, size in specs:
+            self.add(f"{path} {size[0]}x{size[1]}",
+                     lambda path=path, size=size: decode_image(path, size),
+                     lambda surface, path=path, size=size: images.put(path, size, surface),
+                     critical)
+
+    def add_atlas(self, path=ATLAS_FILE, critical=True):
+        """ Queues a prebuilt sprite atlas, in place of decoding each image, see `atlas.py`. """
+        self.add("sprite atlas", lambda: Atlas.load(path), images.add_atlas, critical)
+
+    def add_sounds(self, bank, specs, critical=False):
+        for name, (path, volume, _) in specs.items():
+            self.add(path,
+                     lambda path=path, volume=volume: decode_sound(path, volume),
+                     lambda sound, name=name: bank.add(name, sound),
+                     critical)
+
+    def add_music(self, music, path=THEME_FILE, critical=False):
+        """ Queues preparing the theme for `music`, a `sounds.Music`; the first run decodes it into the cache. """
+        self.add(path, lambda: cached_audio(path), music.open, critical)
+
+    def start(self):
+        # Critical jobs go first, in the order they were added
+        self.jobs.sort(key=lambda job: not job[3])
+        if not self.background:
+            self._work()
+            self.poll()
+            return
+        self._thread = threading.Thread(target=self._work, name="asset-loader", daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        for job in self.jobs:
+            try:
+                self.ready.put((job, job[1](), None))
+            except Exception as error:
+                self.ready.put((job, None, error))
+
+    def poll(self):
+        """
+        Installs everything that has been decoded so far. Call it from the
+        main thread, once a frame. A critical asset that failed to load is
+        raised here; other failures are collected in `errors`.
+        """
+        while True:
+            try:
+                (name, _, install, critical), asset, error = self.ready.get_nowait()
+            except queue.Empty:
+                return
+            self.loaded += 1
+            self.last_loaded = name
+            if critical:
+                self.critical_left -= 1
+            if error is not None:
+                if critical:
+                    raise error
+                self.errors.append((name, error))
+                print(f"Could not load {name}: {error}", file=sys.stderr)
+                continue
+            install(asset)
+
+    @property
+    def total(self):
+        return len(self.jobs)
+
+    @property
+    def progress(self):
+        """ Fraction of all jobs installed, from 0 to 1. """
+        return self.loaded / self.total if self.jobs else 1.0
+
+    @property
+    def critical_ready(self):
+        return self.critical_left == 0
+
+    @property
+    def done(self):
+        return self.loaded == self.total
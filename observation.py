@@ -0,0 +1,92 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only observations for agents need it
+    np = None
+
+from simulation import WIDTH, HEIGHT, TICK_RATE
+
+
+"""
+OBSERVATIONS
+
+What an agent sees of a game: one flat float32 array of OBSERVATION_SIZE,
+the same shape every tick, made of these blocks in order:
+
+    player   PLAYER_FEATURES values: x, y, score / 1000, level,
+             power-ups, seconds played, coins on screen, walls on screen
+    falling  MAX_FALLING rows of FALLING_FEATURES: present, one-hot kind
+             (money, documents, power-up, house), x, y, speed
+    coins    MAX_COINS rows of PROJECTILE_FEATURES: present, x, y
+    walls    MAX_WALLS rows of PROJECTILE_FEATURES: present, x, y
+
+Positions are the top left corner as a fraction of the screen size. The
+falling objects closest to the bottom of the screen come first; when there
+are more objects than rows, the rest are left out. Unused rows are zero.
+"""
+
+PLAYER_FEATURES = 8
+MAX_FALLING = 32
+FALLING_FEATURES = 8
+MAX_COINS = 16
+MAX_WALLS = 32
+PROJECTILE_FEATURES = 3
+
+# Start of each block
+PLAYER_OFFSET = 0
+FALLING_OFFSET = PLAYER_OFFSET + PLAYER_FEATURES
+COINS_OFFSET = FALLING_OFFSET + MAX_FALLING * FALLING_FEATURES
+WALLS_OFFSET = COINS_OFFSET + MAX_COINS * PROJECTILE_FEATURES
+OBSERVATION_SIZE = WALLS_OFFSET + MAX_WALLS * PROJECTILE_FEATURES
+
+
+def observe(sim, out=None):
+    """
+    Returns the observation of `sim` as a float32 array of OBSERVATION_SIZE.
+    Pass the array from the previous call as `out` to fill it in place.
+    """
+    if np is None:
+        raise RuntimeError("Observations need NumPy installed")
+    if out is None:
+        out = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+    else:
+        out.fill(0)
+
+    player = sim.player
+    out[PLAYER_OFFSET:FALLING_OFFSET] = (
+        player.rect.x / WIDTH, player.rect.y / HEIGHT, player.score / 1000, sim.level,
+        player.powerup_count, sim.ticks / TICK_RATE, len(sim.shooting_objects), len(sim.building_objects),
+    )
+
+    _observe_falling(sim, out[FALLING_OFFSET:COINS_OFFSET].reshape(MAX_FALLING, FALLING_FEATURES))
+    _observe_sprites(sim.shooting_objects, out[COINS_OFFSET:WALLS_OFFSET].reshape(MAX_COINS, PROJECTILE_FEATURES))
+    _observe_sprites(sim.building_objects, out[WALLS_OFFSET:].reshape(MAX_WALLS, PROJECTILE_FEATURES))
+    return out
+
+
+def _observe_falling(sim, rows):
+    falling = sim.falling_array
+    if falling is not None:
+        n = falling.count
+        kind, x, y, speed = falling.kind[:n], falling.x[:n], falling.y[:n], falling.speed[:n]
+    else:
+        state = sim.falling_state()
+        n = len(state)
+        if n:
+            kind, x, y, _, _, speed = np.array(state, dtype=np.int32).T
+    if not n:
+        return
+
+    order = np.argsort(-y, kind="stable")[:MAX_FALLING]
+    m = len(order)
+    rows[:m, 0] = 1
+    rows[np.arange(m), 1 + kind[order]] = 1  # Kinds 0-3 flag columns 1-4
+    rows[:m, 5] = x[order] / WIDTH
+    rows[:m, 6] = y[order] / HEIGHT
+    rows[:m, 7] = speed[order]
+
+
+def _observe_sprites(group, rows):
+    for row, sprite in zip(rows, group.sprites()):
+        row[0] = 1
+        row[1] = sprite.rect.x / WIDTH
+        row[2] = sprite.rect.y / HEIGHT
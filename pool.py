@@ -0,0 +1,75 @@
+"""
+SPRITE POOLS
+"""
+
+class SpritePool:
+    """
+    Free list of sprites of one class, so spawning reuses dead sprites
+    instead of building new ones.
+
+    `acquire(*args)` hands out a sprite from the free list after calling its
+    `reset(*args)`, or constructs `cls(world, *args)` if the list is empty.
+    Pooled sprites give themselves back through `release()` when killed,
+    see `Poolable`. A disabled pool never keeps anything, so every sprite
+    is constructed fresh, but it still counts.
+
+    Counters:
+        created     sprites constructed
+        reused      sprites handed out again from the free list
+        in_use      sprites currently out of the pool
+        high_water  the most sprites ever out at the same time
+    """
+
+    def __init__(self, cls, world, enabled=True):
+        self.cls = cls
+        self.world = world
+        self.enabled = enabled
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.in_use = 0
+        self.high_water = 0
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            self.reused += 1
+        else:
+            sprite = self.cls(self.world, *args)
+            sprite.pool = self
+            self.created += 1
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return sprite
+
+    def release(self, sprite):
+        self.in_use -= 1
+        if self.enabled:
+            self.free.append(sprite)
+
+    def stats(self):
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "in_use": self.in_use,
+            "high_water": self.high_water,
+            "free": len(self.free),
+        }
+
+
+class Poolable:
+    """
+    Mixin for sprites that live in a `SpritePool`. Killing the sprite hands
+    it back to its pool; killing it again does nothing.
+    """
+
+    pool = None
+
+    def kill(self):
+        if not self.alive():
+            return
+        super(Poolable, self).kill()
+        if self.pool is not None:
+            self.pool.release(self)
@@ -0,0 +1,284 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+
+"""
+FRAME PROFILER
+"""
+
+class _Section:
+    """ Context manager that adds the time spent inside it to one phase. """
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler._add(self.name, self.start, end - self.start)
+        return False
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class NullProfiler:
+    """ Stands in for a `FrameProfiler` when nothing is being measured. """
+
+    enabled = False
+
+    def section(self, name):
+        return _NULL_SECTION
+
+    def begin_frame(self):
+        pass
+
+    def end_frame(self, counts=None):
+        pass
+
+    def add_latency(self, start, latency):
+        pass
+
+
+class FrameRecord:
+    """ Timings of one frame: phase name -> seconds, plus sprite counts. """
+
+    __slots__ = ("index", "start", "duration", "phases", "events", "counts")
+
+    def __init__(self, index, start, duration, phases, events, counts):
+        self.index = index
+        self.start = start
+        self.duration = duration
+        self.phases = phases
+        self.events = events
+        self.counts = counts
+
+
+class FrameProfiler:
+    """
+    Times each phase of every frame.
+
+    Wrap each phase in `with profiler.section("name"):` between
+    `begin_frame()` and `end_frame()`. Sections may nest and may run more
+    than once a frame; their times add up. The last `history` frames are
+    kept for live statistics. With `trace=True` every frame is also kept,
+    with the start of each section, for `export()`.
+
+    Input latency, from reading an input event to the tick that acts on it,
+    is reported with `add_latency()`; the last `history` samples are kept,
+    and traces get an "input latency" span for each.
+    """
+
+    enabled = True
+
+    def __init__(self, history=600, trace=False):
+        self.history = deque(maxlen=history)
+        self.trace = [] if trace else None
+        self.latencies = deque(maxlen=history)
+        self.frame_count = 0
+        self._sections = {}
+        self._frame_start = None
+        self._phases = {}
+        self._events = []
+        self._origin = time.perf_counter()
+
+    def section(self, name):
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections[name] = _Section(self, name)
+        return section
+
+    def begin_frame(self):
+        self._frame_start = time.perf_counter()
+        self._phases = {}
+        self._events = []
+
+    def end_frame(self, counts=None):
+        if self._frame_start is None:
+            return
+        end = time.perf_counter()
+        record = FrameRecord(self.frame_count, self._frame_start - self._origin, end - self._frame_start,
+                             self._phases, self._events, counts or {})
+        self.frame_count += 1
+        self.history.append(record)
+        if self.trace is not None:
+            self.trace.append(record)
+        self._frame_start = None
+
+    def add_latency(self, start, latency):
+        """ Records an input read at `start` (`time.perf_counter()`) and acted on `latency` seconds later. """
+        self.latencies.append(latency)
+        if self.trace is not None:
+            self._events.append(("input latency", start - self._origin, latency))
+
+    def _add(self, name, start, duration):
+        phases = self._phases
+        phases[name] = phases.get(name, 0.0) + duration
+        if self.trace is not None:
+            self._events.append((name, start - self._origin, duration))
+
+    # Statistics
+
+    def frame_times(self):
+        return [record.duration for record in self.history]
+
+    def percentile(self, percent):
+        """ Frame time in seconds that `percent` of recent frames came in under. """
+        times = sorted(self.frame_times())
+        if not times:
+            return 0.0
+        index = min(len(times) - 1, int(round(percent / 100 * (len(times) - 1))))
+        return times[index]
+
+    def latency_percentile(self, percent):
+        """ Input latency in seconds that `percent` of recent inputs came in under. """
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def fps(self):
+        """ Frames per second over the recent history, wall clock. """
+        if len(self.history) < 2:
+            return 0.0
+        first = self.history[0]
+        last = self.history[-1]
+        elapsed = last.start + last.duration - first.start
+        return len(self.history) / elapsed if elapsed > 0 else 0.0
+
+    def phase_means(self):
+        """ Mean seconds per frame spent in each phase, over the recent history. """
+        totals = {}
+        for record in self.history:
+            for name, duration in record.phases.items():
+                totals[name] = totals.get(name, 0.0) + duration
+        count = len(self.history) or 1
+        return {name: total / count for name, total in totals.items()}
+
+    # Export
+
+    def export(self, path):
+        """ Writes the trace to `path`: Chrome trace JSON for .json, CSV otherwise. """
+        if self.trace is None:
+            raise RuntimeError("Tracing was not enabled for this profiler")
+        if path.endswith(".json"):
+            self.export_chrome_trace(path)
+        else:
+            self.export_csv(path)
+
+    def export_csv(self, path):
+        phase_names = sorted({name for record in self.trace for name in record.phases})
+        count_names = sorted({name for record in self.trace for name in record.counts})
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame", "start_ms", "frame_ms"]
+                            + [f"{name}_ms" for name in phase_names] + count_names)
+            for record in self.trace:
+                writer.writerow([record.index, f"{record.start * 1000:.3f}", f"{record.duration * 1000:.3f}"]
+                                + [f"{record.phases.get(name, 0.0) * 1000:.3f}" for name in phase_names]
+                                + [record.counts.get(name, 0) for name in count_names])
+
+    def export_chrome_trace(self, path):
+        """ Writes the trace in the Chrome trace event format (chrome://tracing, Perfetto). """
+        events = []
+        for record in self.trace:
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": record.start * 1e6, "dur": record.duration * 1e6,
+                           "args": {"frame": record.index}})
+            for name, start, duration in record.events:
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": start * 1e6, "dur": duration * 1e6})
+            if record.counts:
+                events.append({"name": "sprites", "ph": "C", "pid": 1, "tid": 1,
+                               "ts": record.start * 1e6, "args": record.counts})
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def sprite_counts(sim):
+    """ Number of live objects in each of the simulation's groups. """
+    return {
+        "falling": sim.falling_count,
+        "coins": len(sim.shooting_objects),
+        "walls": len(sim.building_objects),
+        "all_sprites": len(sim.all_sprites),
+    }
+
+
+"""
+OVERLAY
+"""
+
+class ProfilerOverlay:
+    """
+    On-screen panel with FPS, frame time percentiles, sprite counts and the
+    per-phase breakdown. The panel is re-rendered every `refresh` frames so
+    drawing it costs little itself.
+    """
+
+    def __init__(self, refresh=15):
+        self.font = pygame.font.SysFont(None, 18)
+        self.refresh = refresh
+        self.visible = False
+        self.surface = None
+        self._frames = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.surface = None
+        self._frames = 0
+
+    def update(self, profiler, counts, extra=()):
+        """ Returns the panel surface, or None while the overlay is hidden. """
+        if not self.visible:
+            return None
+        if self.surface is not None and self._frames % self.refresh:
+            self._frames += 1
+            return self.surface
+        self._frames += 1
+
+        lines = [
+            f"FPS {profiler.fps():.1f}",
+            f"frame p50 {profiler.percentile(50) * 1000:.2f} ms  p99 {profiler.percentile(99) * 1000:.2f} ms",
+            "  ".join(f"{name} {count}" for name, count in counts.items()),
+        ]
+        if profiler.latencies:
+            lines.append(f"input lag p50 {profiler.latency_percentile(50) * 1000:.2f} ms  "
+                         f"p99 {profiler.latency_percentile(99) * 1000:.2f} ms")
+        lines.extend(extra)
+        for name, mean in sorted(profiler.phase_means().items(), key=lambda item: -item[1]):
+            lines.append(f"{name:<14}{mean * 1000:7.3f} ms")
+
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(surface.get_width() for surface in rendered) + 8
+        height = sum(surface.get_height() for surface in rendered) + 8
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        y = 4
+        for surface in rendered:
+            panel.blit(surface, (4, y))
+            y += surface.get_height()
+        self.surface = panel
+        return panel
@@ -0,0 +1,488 @@
+from contextlib import contextmanager
+
+import pygame
+
+from assets import images
+from fallingarray import KIND_IMAGE
+from simulation import WIDTH, HEIGHT
+from textcache import TextCache, TextWidget
+
+
+"""
+CONSTANTS
+"""
+# Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 0)
+
+
+"""
+RENDERER
+"""
+
+class Renderer:
+    """
+    Draws a `Simulation` onto a surface.
+
+    The renderer only reads the simulation, it never changes it, so a game
+    can be run with or without one. Sprites are drawn `sim.alpha` of the way
+    along their last move, see `interpolated()`.
+
+    Every frame is drawn from scratch and the whole screen is flipped.
+    `update_fraction` is the share of the screen sent to the display on the
+    last frame, which for this renderer is always all of it.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.update_fraction = 1.0
+        self._fraction_total = 0.0
+        self._frames = 0
+        self.overlay = None  # Debug panel drawn over everything, see `set_overlay()`
+
+        # Fonts
+        self.game_over_font = pygame.font.SysFont(None, 60)
+        self.score_font = pygame.font.SysFont(None, 24)
+        self.high_score_font = pygame.font.SysFont(None, 24, bold=True)
+        self.user_high_score_font = pygame.font.SysFont(None, 28, bold=True)
+        self.restart_font = pygame.font.SysFont(None, 24)
+
+        self.input_rect = pygame.Rect(300, 250, 45, 32)  # Adjust the position and size of the input box
+
+        # Text that changes now and then (high score rows, initials, the final score)
+        self.text = TextCache()
+
+        # HUD values, re-rendered only when they change
+        self.score_widget = TextWidget(self.score_font, "Score: {}", WHITE, (10, 30))
+        self.level_widget = TextWidget(self.score_font, "Level: {}", WHITE, (13, 10))
+
+        # Static labels, rendered once
+        self.labels = {
+            "game_over": self._label(self.game_over_font, "Game Over", YELLOW, center=(WIDTH // 2, HEIGHT // 2 - 50)),
+            "restart": self._label(self.restart_font, "Press SPACE to restart", WHITE, center=(WIDTH // 2, HEIGHT // 2 - 20)),
+            "high_scores": self._label(self.high_score_font, "HIGH SCORES:", WHITE, center=(WIDTH // 2, HEIGHT // 2 + 75)),
+            "high_score": self._label(self.game_over_font, "HIGH SCORE!", WHITE, center=(WIDTH // 2, HEIGHT // 2 - 150)),
+            "press_a": self._label(self.score_font, "|PRESS A|", WHITE, topleft=(270, 10)),
+            "press_b": self._label(self.score_font, "|PRESS B|", WHITE, topleft=(270, 10)),
+        }
+
+    def _label(self, font, text, color, **position):
+        surface = font.render(text, True, color)
+        return surface, surface.get_rect(**position)
+
+    def blit_label(self, name):
+        surface, rect = self.labels[name]
+        self.screen.blit(surface, rect)
+
+    @contextmanager
+    def interpolated(self, sim):
+        """
+        Moves every sprite that moved on the last tick `sim.alpha` of the way
+        from where it started the tick to where it is now, for as long as the
+        block runs, then puts it back. Yields the sprites that were moved.
+        """
+        alpha = sim.alpha
+        moved = []
+        if alpha < 1:
+            for sprite, (x, y) in sim.previous_positions.items():
+                rect = sprite.rect
+                if (x != rect.x or y != rect.y) and sprite.alive():
+                    moved.append((sprite, rect.topleft))
+                    rect.topleft = (round(x + (rect.x - x) * alpha), round(y + (rect.y - y) * alpha))
+        try:
+            yield [sprite for sprite, _ in moved]
+        finally:
+            for sprite, position in moved:
+                sprite.rect.topleft = position
+
+    def draw(self, sim):
+        """ Clears the screen and draws every sprite. """
+        screen = self.screen
+        screen.fill(BLACK)
+
+        # Draw sprites
+        with self.interpolated(sim):
+            sim.all_sprites.draw(screen)
+        if sim.falling_array is not None:
+            sim.falling_array.draw(screen, sim.alpha)
+
+    def draw_hud(self, sim):
+        screen = self.screen
+
+        # Draw the score
+        self.score_widget.set(sim.player.score)
+        self.score_widget.draw(screen)
+
+        # Draw the level
+        self.level_widget.set(sim.level)
+        self.level_widget.draw(screen)
+
+        # Press A
+        if sim.level == 3:
+            self.blit_label("press_a")
+
+        # Press B
+        if sim.level == 7:
+            self.blit_label("press_b")
+
+        self.draw_powerup_indicator(sim.player.powerup_count)
+
+    def draw_powerup_indicator(self, powerup_count):
+        power_up_image = images.get("coin.png", (30, 30))
+        power_up_spacing = 5
+        for i in range(powerup_count):
+            power_up_x = WIDTH - (i + 1) * (power_up_image.get_width() + power_up_spacing)
+            power_up_y = power_up_spacing * 2
+            self.screen.blit(power_up_image, (power_up_x, power_up_y))
+
+    def draw_game_over(self, sim, high_scores, initials, input_active, is_cursor_visible):
+        """ Draws the game over screen, high score table and initials entry box. """
+        screen = self.screen
+
+        self.blit_label("game_over")
+        self.blit_label("restart")
+
+        # Draw the high scores
+        self.blit_label("high_scores")
+
+        y_offset = 0
+        for i, entry in enumerate(high_scores):
+            ranking = f"#{i+1}"  # Calculate the ranking
+            old_initials = entry["initials"]
+            old_score = entry["score"]
+            high_score_text = self.text.render(self.score_font, f"{ranking}: {old_initials}: {old_score}", WHITE)
+            high_score_text_rect = high_score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 105 + y_offset))
+            screen.blit(high_score_text, high_score_text_rect)
+            y_offset += 28
+
+        # Draw the input box if active
+        if input_active:
+            input_rect = self.input_rect
+
+            self.blit_label("high_score")
+
+            if len(initials) == 3 or not is_cursor_visible:
+                player_score_text = self.text.render(self.game_over_font, str(sim.player.score), WHITE)
+                player_score_text_rect = player_score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100))
+                screen.blit(player_score_text, player_score_text_rect)
+
+            pygame.draw.rect(screen, WHITE, input_rect, 2)
+            initials_text = self.text.render(self.score_font, initials.upper(), WHITE)
+            screen.blit(initials_text, input_rect.move(5, 8))
+
+            # Draw the blinking cursor if the length of initials is less than 3
+            if len(initials) < 3 and is_cursor_visible:
+                cursor_rect = pygame.Rect(input_rect.x + initials_text.get_width() + 2, input_rect.y + input_rect.height // 2 - 10, 12, input_rect.height - 14)
+                pygame.draw.rect(screen, WHITE, cursor_rect)
+
+    def set_overlay(self, surface):
+        """ Shows `surface` in the bottom left corner over everything else, or nothing if None. """
+        self.overlay = surface
+
+    def present(self):
+        if self.overlay is not None:
+            self.screen.blit(self.overlay, self.overlay.get_rect(bottomleft=(0, HEIGHT)))
+        pygame.display.flip()
+        self._record_fraction(1.0)
+
+    @property
+    def average_update_fraction(self):
+        """ Mean share of the screen updated per frame so far. """
+        return self._fraction_total / self._frames if self._frames else 0.0
+
+    def _record_fraction(self, fraction):
+        self.update_fraction = fraction
+        self._fraction_total += fraction
+        self._frames += 1
+
+
+# LayeredDirty layers, back to front. Layer 0 is the background surface.
+# The simulation's sprites share one layer, in `all_sprites` order, so they
+# stack exactly as the full renderer draws them: the player at the bottom.
+LAYER_SPRITES = 1
+LAYER_HUD = 2
+LAYER_OVERLAY = 3
+
+
+class HudSprite(pygame.sprite.DirtySprite):
+    """ A HUD element drawn by `DirtyRenderer`. Set `image` with `show()`. """
+
+    def __init__(self):
+        super(HudSprite, self).__init__()
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect()
+        self.visible = 0
+
+    def show(self, image, **position):
+        self.image = image
+        self.rect = image.get_rect(**position)
+        self.visible = 1
+        self.dirty = 1
+
+    def hide(self):
+        if self.visible:
+            self.visible = 0
+            self.dirty = 1
+
+
+class DirtyRenderer(Renderer):
+    """
+    Renderer that only redraws and presents the parts of the screen that
+    changed, using `pygame.sprite.LayeredDirty` and `display.update(rects)`.
+
+    The simulation's sprites are mirrored into one `LayeredDirty` group, on
+    one layer in the order the full renderer draws them. Sprites flag
+    themselves dirty when they move, and the HUD is made of `HudSprite`s
+    that are only flagged when their value changes, so a quiet frame
+    touches very little of the screen.
+    Objects in a `FallingArray` are not sprites: the rects they covered last
+    frame are repainted and they are drawn on top each frame.
+
+    Between ticks, sprites drawn part way along their last move are flagged
+    dirty every frame, as are the ones that were last frame and have since
+    come to rest.
+
+    A sprite drawn bigger than its rect, like the house, has its rect grown
+    to the image's size while the group draws, so all of it is cleared,
+    overlapped and sent to the display.
+
+    The game over screen is redrawn in full, but only on frames where what
+    it shows has changed.
+    """
+
+    def __init__(self, screen):
+        super(DirtyRenderer, self).__init__(screen)
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.background.fill(BLACK)
+        self.screen_rect = screen.get_rect()
+        self.screen_area = self.screen_rect.width * self.screen_rect.height
+
+        self.layered = pygame.sprite.LayeredDirty()
+        self.layered.clear(screen, self.background)
+
+        self.score_sprite = HudSprite()
+        self.level_sprite = HudSprite()
+        self.hint_sprite = HudSprite()
+        self.powerup_sprite = HudSprite()
+        self.hud_sprites = [self.score_sprite, self.level_sprite, self.hint_sprite, self.powerup_sprite]
+        self._hint = None
+        self._powerup_count = None
+        self.overlay_sprite = HudSprite()
+
+        self._sim = None
+        self._player = None
+        self._array_rects = []
+        self._interpolated = set()  # Sprites drawn between ticks last frame
+        self._oversized = set()  # Sprites whose image is bigger than their rect
+        self._game_over_args = None
+        self._game_over_state = None
+        self._repaint = True
+
+    def draw(self, sim):
+        """ Adds any new simulation sprites to the layered group. """
+        layered = self.layered
+        if sim.player is not self._player:
+            # A new game: drop every sprite from the old one
+            layered.empty()
+            self._player = sim.player
+            self._array_rects = []
+            self._oversized = set()
+            self._repaint = True
+            layered.add(*self.hud_sprites, layer=LAYER_HUD)
+            layered.add(self.overlay_sprite, layer=LAYER_OVERLAY)
+
+        # Killed sprites leave the layered group on their own, so only
+        # additions need syncing. New sprites go on top in `all_sprites`
+        # order, which is where `all_sprites` has them too.
+        for sprite in sim.all_sprites.sprites():
+            if not layered.has(sprite):
+                layered.add(sprite, layer=LAYER_SPRITES)
+                if sprite.image.get_size() != sprite.rect.size:
+                    self._oversized.add(sprite)
+
+        self._sim = sim
+        self._game_over_args = None
+
+    def draw_hud(self, sim):
+        """ Updates the HUD sprites whose value changed. """
+        if self.score_widget.set(sim.player.score):
+            self.score_sprite.show(self.score_widget.surface, topleft=self.score_widget.pos)
+        if self.level_widget.set(sim.level):
+            self.level_sprite.show(self.level_widget.surface, topleft=self.level_widget.pos)
+
+        hint = {3: "press_a", 7: "press_b"}.get(sim.level)
+        if hint != self._hint:
+            self._hint = hint
+            if hint is None:
+                self.hint_sprite.hide()
+            else:
+                surface, rect = self.labels[hint]
+                self.hint_sprite.show(surface, topleft=rect.topleft)
+
+        powerup_count = max(sim.player.powerup_count, 0)
+        if powerup_count != self._powerup_count:
+            self._powerup_count = powerup_count
+            if powerup_count == 0:
+                self.powerup_sprite.hide()
+            else:
+                self.powerup_sprite.show(self._powerup_strip(powerup_count), topright=(WIDTH, 0))
+
+    def set_overlay(self, surface):
+        if surface is self.overlay:
+            return
+        self.overlay = surface
+        if surface is None:
+            self.overlay_sprite.hide()
+        else:
+            self.overlay_sprite.show(surface, bottomleft=(0, HEIGHT))
+
+    def draw_game_over(self, sim, high_scores, initials, input_active, is_cursor_visible):
+        """ Remembers what the game over screen shows; it is drawn in `present()`. """
+        self._game_over_args = (sim, high_scores, initials, input_active, is_cursor_visible)
+
+    def present(self):
+        screen = self.screen
+        layered = self.layered
+
+        game_over_state = None
+        if self._game_over_args is not None:
+            _, high_scores, initials, input_active, is_cursor_visible = self._game_over_args
+            game_over_state = (id(high_scores), initials, input_active, is_cursor_visible)
+        if game_over_state != self._game_over_state:
+            self._game_over_state = game_over_state
+            self._repaint = True
+
+        if self._game_over_args is not None and self.overlay_sprite.dirty:
+            self._repaint = True
+        if self._game_over_args is not None and not self._repaint:
+            # The world is frozen under an unchanged game over screen
+            rects = layered.draw(screen, self.background)
+            pygame.display.update(rects)
+            self._record_fraction(self._fraction_of_screen(rects))
+            return
+
+        if self._repaint:
+            layered.repaint_rect(self.screen_rect)
+        for rect in self._array_rects:
+            layered.repaint_rect(rect)
+
+        # Array objects are drawn outside the layered group, so HUD sprites
+        # they touch are held back and blitted again on top of them.
+        sim = self._sim
+        falling_array = sim.falling_array
+        array_rects = []
+        if falling_array is not None and len(falling_array):
+            # Drawn size, not collision size: the house is drawn far bigger than it collides
+            n = falling_array.count
+            array_rects = [pygame.Rect((x, y), KIND_IMAGE[kind][1]) for kind, x, y in zip(
+                falling_array.kind[:n].tolist(), falling_array.x[:n].tolist(), falling_array.drawn_y(sim.alpha))]
+        covered_hud = []
+        if array_rects or self._array_rects:
+            for sprite in self.hud_sprites + [self.overlay_sprite]:
+                if sprite.visible and (sprite.rect.collidelist(array_rects) != -1
+                                       or sprite.rect.collidelist(self._array_rects) != -1):
+                    sprite.visible = 0
+                    layered.repaint_rect(sprite.rect)
+                    covered_hud.append(sprite)
+
+        with self.interpolated(sim) as moved, self._drawn_sizes():
+            interpolated = set(moved)
+            for sprite in interpolated | self._interpolated:
+                if sprite.alive():
+                    sprite.dirty = 1
+            self._interpolated = interpolated
+            rects = layered.draw(screen, self.background)
+
+        if array_rects:
+            falling_array.draw(screen, sim.alpha)
+        for sprite in covered_hud:
+            sprite.visible = 1
+            # Record where it was drawn, so the group clears it next time it moves
+            layered.spritedict[sprite] = screen.blit(sprite.image, sprite.rect)
+        rects = rects + self._array_rects + array_rects + [sprite.rect for sprite in covered_hud]
+        self._array_rects = array_rects
+
+        if self._repaint:
+            if self._game_over_args is not None:
+                Renderer.draw_game_over(self, *self._game_over_args)
+                if self.overlay is not None:
+                    screen.blit(self.overlay, self.overlay_sprite.rect)
+            rects = [self.screen_rect]
+            self._repaint = False
+
+        pygame.display.update(rects)
+        self._record_fraction(self._fraction_of_screen(rects))
+
+    @contextmanager
+    def _drawn_sizes(self):
+        # Grows the rects of oversized sprites to their images while the block runs
+        grown = []
+        for sprite in self._oversized:
+            if sprite.alive():
+                grown.append((sprite, sprite.rect.size))
+                sprite.rect.size = sprite.image.get_size()
+        try:
+            yield
+        finally:
+            for sprite, size in grown:
+                sprite.rect.size = size
+
+    def _fraction_of_screen(self, rects):
+        # Overlapping rects are counted twice, so this slightly overestimates.
+        screen_rect = self.screen_rect
+        area = 0
+        for rect in rects:
+            clipped = screen_rect.clip(rect)
+            area += clipped.width * clipped.height
+        return min(area / self.screen_area, 1.0)
+
+    def _powerup_strip(self, powerup_count):
+        # Same layout as `draw_powerup_indicator()`: icons from the right edge in.
+        power_up_image = images.get("coin.png", (30, 30))
+        power_up_spacing = 5
+        step = power_up_image.get_width() + power_up_spacing
+        strip = pygame.Surface((powerup_count * step, power_up_spacing * 2 + power_up_image.get_height()), pygame.SRCALPHA)
+        for i in range(powerup_count):
+            strip.blit(power_up_image, (strip.get_width() - (i + 1) * step, power_up_spacing * 2))
+        return strip
+
+
+RENDERERS = {
+    "full": Renderer,
+    "dirty": DirtyRenderer,
+}
+
+
+"""
+LOADING SCREEN
+"""
+
+class LoadingScreen:
+    """
+    Progress bar shown while assets load. Uses pygame's built-in font and
+    no images, so it can be drawn the moment the window opens.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.font = pygame.font.Font(None, 36)
+        self.small_font = pygame.font.Font(None, 20)
+        self.title = self.font.render("TrumpRunner v2", True, YELLOW)
+        self.bar = pygame.Rect(0, 0, WIDTH // 2, 16)
+        self.bar.center = (WIDTH // 2, HEIGHT // 2 + 20)
+
+    def draw(self, progress, label=None):
+        """ Draws the bar at `progress` (0 to 1) and flips the display. """
+        screen = self.screen
+        screen.fill(BLACK)
+        screen.blit(self.title, self.title.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 20)))
+        pygame.draw.rect(screen, WHITE, self.bar, 1)
+        filled = self.bar.inflate(-4, -4)
+        filled.width = round(filled.width * progress)
+        if filled.width:
+            screen.fill(WHITE, filled)
+        if label:
+            text = self.small_font.render(f"Loading {label}", True, WHITE)
+            screen.blit(text, text.get_rect(center=(WIDTH // 2, self.bar.bottom + 20)))
+        pygame.display.flip()
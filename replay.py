@@ -0,0 +1,221 @@
+import argparse
+import os
+import struct
+import sys
+import time
+
+from levels import LevelTableError, load_schedule
+from simulation import Simulation, TICK_RATE, init_headless
+
+
+"""
+REPLAY FILES
+
+A replay is everything needed to play a game again exactly: the seed of the
+simulation's random number generator and the input bitmask of every tick.
+The final score and level are stored too, so a replay can be checked. The
+level table is not stored; replays play back against the same table they
+were recorded with, `levels.json` unless told otherwise.
+
+Layout, little endian:
+    header   magic b"TRRP", version (u8), seed (u32), ticks (u32),
+             final score (i32), final level (u8)
+    body     runs of identical inputs, each a mask byte followed by the
+             run length as an unsigned LEB128 varint
+"""
+
+MAGIC = b"TRRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBIIiB")
+MAX_SEED = 2**32 - 1  # Largest seed the header's u32 can hold
+
+
+class ReplayError(Exception):
+    """ Raised for files that are not valid replays. """
+
+
+class Replay:
+    """ A recorded game: seed, per-tick inputs and the outcome it ended with. """
+
+    def __init__(self, seed, inputs, score=0, level=0):
+        self.seed = seed
+        self.inputs = inputs  # One input bitmask per tick
+        self.score = score
+        self.level = level
+
+    @property
+    def ticks(self):
+        return len(self.inputs)
+
+    def to_bytes(self):
+        body = bytearray()
+        inputs = self.inputs
+        i = 0
+        while i < len(inputs):
+            mask = inputs[i]
+            run = 1
+            while i + run < len(inputs) and inputs[i + run] == mask:
+                run += 1
+            body.append(mask)
+            _write_varint(body, run)
+            i += run
+        return HEADER.pack(MAGIC, VERSION, self.seed, len(inputs), self.score, self.level) + bytes(body)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("File is too short to be a replay")
+        magic, version, seed, ticks, score, level = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("Not a replay file")
+        if version != VERSION:
+            raise ReplayError(f"Unsupported replay version {version}")
+
+        inputs = []
+        offset = HEADER.size
+        while offset < len(data):
+            mask = data[offset]
+            run, offset = _read_varint(data, offset + 1)
+            inputs.extend([mask] * run)
+        if len(inputs) != ticks:
+            raise ReplayError(f"Replay says {ticks} ticks but holds {len(inputs)}")
+        return cls(seed, inputs, score, level)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+def _write_varint(buffer, value):
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            buffer.append(byte | 0x80)
+        else:
+            buffer.append(byte)
+            return
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError("Replay is truncated")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+"""
+RECORDING AND PLAYBACK
+"""
+
+class ReplayRecorder:
+    """
+    Records a `Simulation` as it is played.
+
+    Attach with `sim.recorder = ReplayRecorder(sim)`; the simulation then
+    hands every tick's inputs to `record()`. `replay()` snapshots the
+    recording so far, including the current score and level.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.seed = sim.seed
+        self.inputs = []
+
+    def record(self, inputs):
+        self.inputs.append(inputs)
+
+    def replay(self):
+        return Replay(self.seed, list(self.inputs), self.sim.player.score, self.sim.level)
+
+
+def play(replay, backend="sprites", schedule=None):
+    """ Re-runs `replay` headlessly, as fast as possible. Returns the `Simulation`. """
+    sim = Simulation(replay.seed, backend, schedule=schedule)
+    tick = sim.tick
+    for inputs in replay.inputs:
+        tick(inputs)
+    return sim
+
+
+def verify(replay, backend="sprites", schedule=None):
+    """
+    Re-runs `replay` and checks it ends with the recorded score and level.
+    Returns `(ok, sim)`.
+    """
+    sim = play(replay, backend, schedule)
+    ok = sim.player.score == replay.score and sim.level == replay.level
+    return ok, sim
+
+
+def replay_filename(directory, replay, suffix=""):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"replay-{stamp}-{replay.seed}-{replay.score}{suffix}.trr")
+
+
+"""
+COMMAND LINE
+"""
+
+def seed_argument(text):
+    """ argparse type for seeds a replay can store, 0 to MAX_SEED. """
+    seed = int(text)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"must be from 0 to {MAX_SEED}, not {seed}")
+    return seed
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Inspect and verify TrumpRunner replays.")
+    parser.add_argument("command", choices=("verify", "info"))
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--backend", choices=("sprites", "numpy"), default="sprites")
+    parser.add_argument("--levels", metavar="FILE", default=None, help="level table the replays were recorded with")
+    args = parser.parse_args(args)
+
+    init_headless()
+    try:
+        schedule = load_schedule(args.levels, TICK_RATE)
+    except (OSError, LevelTableError) as error:
+        print(f"{args.levels or 'levels.json'}: {error}")
+        return 1
+    failures = 0
+    for path in args.files:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ReplayError) as error:
+            print(f"{path}: {error}")
+            failures += 1
+            continue
+
+        if args.command == "info":
+            print(f"{path}: seed {replay.seed}, {replay.ticks} ticks "
+                  f"({replay.ticks / TICK_RATE:.1f}s), score {replay.score}, level {replay.level}")
+            continue
+
+        start = time.perf_counter()
+        ok, sim = verify(replay, args.backend, schedule)
+        duration = time.perf_counter() - start
+        if ok:
+            print(f"{path}: OK, score {sim.player.score}, level {sim.level} ({duration:.3f}s)")
+        else:
+            failures += 1
+            print(f"{path}: MISMATCH, recorded score {replay.score} level {replay.level}, "
+                  f"replayed score {sim.player.score} level {sim.level}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
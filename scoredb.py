@@ -0,0 +1,239 @@
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+from highscores import HighScoreTable
+from writer import BackgroundWriter
+
+
+"""
+SCORE DATABASE
+
+An SQLite alternative to the `high_scores.txt` file that keeps every
+finished run, not just the named top scores:
+
+    runs     id, score, initials (NULL until entered), level reached,
+             duration in seconds, played_at (Unix time), and the local
+             day ("2024-05-31") and ISO week ("2024-W22") it was played in
+    imports  text score files already copied in, by absolute path
+
+Indexes cover the queries the game and the leaderboards make: named runs
+by score (top N), by initials then score (a player's best), and by day or
+week then score (daily and weekly boards). Each is an index range scan
+that stops after N rows.
+
+The database runs in WAL mode, so any number of readers and one writer
+can use it at once, and several game instances can share a file. Writes
+go through a `writer.BackgroundWriter`, on a connection of their own;
+the frame loop only ever queues them.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    initials TEXT,
+    level INTEGER,
+    duration REAL,
+    played_at REAL,
+    day TEXT,
+    week TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_top ON runs (score DESC) WHERE initials IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_initials ON runs (initials, score DESC);
+CREATE INDEX IF NOT EXISTS runs_day ON runs (day, score DESC) WHERE initials IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_week ON runs (week, score DESC) WHERE initials IS NOT NULL;
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    imported_at REAL NOT NULL
+);
+"""
+
+BUSY_TIMEOUT = 5.0  # Seconds to wait for another instance's write to finish
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; a power cut loses at most the last runs
+    return connection
+
+
+def _period_keys(timestamp):
+    """ The local day and ISO week `timestamp` falls in. """
+    date = datetime.date.fromtimestamp(timestamp)
+    year, week, _ = date.isocalendar()
+    return date.isoformat(), f"{year}-W{week:02d}"
+
+
+class Run:
+    """ A finished run queued for the database. `id` is filled in once it is written. """
+
+    def __init__(self, score, level, duration, played_at):
+        self.id = None
+        self.score = score
+        self.level = level
+        self.duration = duration
+        self.played_at = played_at
+
+
+class ScoreDatabase(HighScoreTable):
+    """
+    `HighScoreTable` backed by an SQLite database.
+
+    The top `max_entries` named scores are read into memory when the
+    database is opened, so `top()`, `rank()` and `qualifies()` answer
+    without touching the disk, exactly like the text table. `record_run()`
+    and `add()` update memory straight away and queue the database write
+    with `writer`, a `BackgroundWriter` of its own unless one is given.
+
+    `import_path` names a `score,initials` text file to copy in the first
+    time this database sees it, so switching over keeps the old table.
+    `best()` and `leaderboard()` query the database itself; call `flush()`
+    first to make sure they see this instance's latest runs.
+    """
+
+    def __init__(self, path="scores.db", import_path=None, max_entries=100, display_count=5, writer=None):
+        self._owns_writer = writer is None
+        self._connection = _connect(path)
+        self._write_connection = None  # Opened by the first write, on the writer's thread
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+        if import_path is not None:
+            self.import_text(import_path)
+        super(ScoreDatabase, self).__init__(path, max_entries, display_count,
+                                            writer or BackgroundWriter(name="score-writer"))
+
+    def load(self):
+        """ (Re)reads the best named scores, including other instances' latest ones. """
+        rows = self._connection.execute(
+            "SELECT score, initials FROM runs WHERE initials IS NOT NULL ORDER BY score DESC, id LIMIT ?",
+            (self.max_entries,)).fetchall()
+        self._entries = [(-score, next(self._sequence), initials) for score, initials in rows]
+        self._top = None
+
+    def import_text(self, path):
+        """
+        Copies the entries of a `score,initials` text file into the database,
+        unless this file was imported before. Returns the number copied.
+        """
+        key = os.path.abspath(path)
+        table = HighScoreTable(path, max_entries=sys.maxsize)
+        with self._connection:
+            if self._connection.execute("SELECT 1 FROM imports WHERE path = ?", (key,)).fetchone():
+                return 0
+            entries = table.top(len(table))
+            self._connection.executemany(
+                "INSERT INTO runs (score, initials) VALUES (?, ?)",
+                [(entry["score"], entry["initials"]) for entry in entries])  # Keeps equal scores in file order
+            self._connection.execute("INSERT INTO imports (path, imported_at) VALUES (?, ?)", (key, time.time()))
+        return len(entries)
+
+    def record_run(self, score, level, duration, played_at=None):
+        """
+        Queues a finished run, without initials, and returns it. Pass it to
+        `add()` if the player then enters their initials.
+        """
+        run = Run(score, level, duration, time.time() if played_at is None else played_at)
+        self._queue(self._insert_run, run)
+        return run
+
+    def add(self, score, initials, run=None):
+        """
+        Puts the initials on `run`, or records a new run with just a score
+        and initials, then adds the entry to the in-memory table. Returns
+        the entry's rank, or None if it did not make the table.
+        """
+        initials = initials.upper()
+        if run is None:
+            self._queue(self._insert_named, score, initials, time.time())
+        else:
+            self._queue(self._name_run, run, initials)
+        return super(ScoreDatabase, self).add(score, initials)
+
+    def save(self):
+        """ Nothing to do; every run is written as it is queued. """
+
+    def best(self, initials):
+        """ The best score entered under `initials`, or None. """
+        row = self._connection.execute(
+            "SELECT score FROM runs WHERE initials = ? ORDER BY score DESC LIMIT 1",
+            (initials.upper(),)).fetchone()
+        return row[0] if row else None
+
+    def leaderboard(self, period, count=None, now=None):
+        """
+        The best named runs of the current `period` ("day" or "week"), as
+        `{"score", "initials", "level", "duration"}` dicts.
+        """
+        if period not in ("day", "week"):
+            raise ValueError(f"Unknown leaderboard period: {period!r}")
+        count = self.display_count if count is None else count
+        day, week = _period_keys(time.time() if now is None else now)
+        rows = self._connection.execute(
+            f"SELECT score, initials, level, duration FROM runs "
+            f"WHERE {period} = ? AND initials IS NOT NULL ORDER BY score DESC, id LIMIT ?",
+            (day if period == "day" else week, count)).fetchall()
+        return [{"score": score, "initials": initials, "level": level, "duration": duration}
+                for score, initials, level, duration in rows]
+
+    def flush(self):
+        """ Waits until every queued write is in the database. """
+        self.writer.flush()
+
+    def close(self):
+        """
+        Queues closing the write connection and closes the database. A writer
+        of its own is flushed and stopped; a shared one is left to its owner.
+        """
+        self.writer.submit(self._close_write_connection)
+        if self._owns_writer:
+            self.writer.close()
+        self._connection.close()
+
+    def _queue(self, write, *args):
+        self.writer.submit(self._write, write, args)
+
+    # Writes, run on the writer's thread in the order they were queued
+
+    def _write(self, write, args):
+        if self._write_connection is None:
+            self._write_connection = _connect(self.path)
+        with self._write_connection:
+            write(self._write_connection, *args)
+
+    def _close_write_connection(self):
+        if self._write_connection is not None:
+            self._write_connection.close()
+            self._write_connection = None
+
+    @staticmethod
+    def _insert_run(connection, run):
+        day, week = _period_keys(run.played_at)
+        run.id = connection.execute(
+            "INSERT INTO runs (score, level, duration, played_at, day, week) VALUES (?, ?, ?, ?, ?, ?)",
+            (run.score, run.level, run.duration, run.played_at, day, week)).lastrowid
+
+    @staticmethod
+    def _name_run(connection, run, initials):
+        connection.execute("UPDATE runs SET initials = ? WHERE id = ?", (initials, run.id))
+
+    @staticmethod
+    def _insert_named(connection, score, initials, played_at):
+        day, week = _period_keys(played_at)
+        connection.execute("INSERT INTO runs (score, initials, played_at, day, week) VALUES (?, ?, ?, ?, ?)",
+                           (score, initials, played_at, day, week))
+
+
+def open_scores(path, import_path="high_scores.txt", writer=None):
+    """
+    Opens the score store at `path`: a `ScoreDatabase` for `.db`, `.sqlite`
+    and `.sqlite3` files, importing `import_path` once, or a plain text
+    `HighScoreTable` for anything else. Both save through `writer`.
+    """
+    if os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return ScoreDatabase(path, import_path if import_path and os.path.exists(import_path) else None,
+                             writer=writer)
+    return HighScoreTable(path, writer=writer)
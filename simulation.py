@@ -0,0 +1,670 @@
+import argparse
+import os
+import random
+import time
+
+import pygame
+
+from assets import images, SPRITE_SPECS
+from collision import CollisionIndex
+from fallingarray import FallingArray, KIND_MONEY, KIND_DOCUMENTS, KIND_POWERUP, KIND_HOUSE
+from levels import load_schedule
+from pool import Poolable, SpritePool
+from profiling import NullProfiler
+
+
+"""
+CONSTANTS
+"""
+# Window dimensions
+WIDTH, HEIGHT = 640, 480
+
+# The simulation always advances in fixed ticks of this length, no matter
+# how often the game is drawn.
+TICK_RATE = 60
+FIXED_DT = 1 / TICK_RATE
+
+# Speeds, in pixels a second. Things move in whole pixels each tick, see
+# `per_tick()`; falling money and documents get their speeds from the level.
+PLAYER_SPEED = 300
+COIN_SPEED = 300
+WALL_SPEED = 300
+WALL_WOBBLE = 120  # Walls drift sideways by up to this while they rise
+POWERUP_SPEED = 300
+HOUSE_SPEED = 60
+
+# Level timings and difficulty come from a level table, see `levels.py`.
+# Headless runs default to the full run time of the classic table.
+RUN_LENGTH = 203  # Seconds, 3:23
+
+# Input bits. The inputs for one tick are a bitmask of these.
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_SHOOT = 16
+INPUT_BUILD = 32
+
+_KEY_BITS = (
+    (pygame.K_LEFT, INPUT_LEFT),
+    (pygame.K_RIGHT, INPUT_RIGHT),
+    (pygame.K_UP, INPUT_UP),
+    (pygame.K_DOWN, INPUT_DOWN),
+    (pygame.K_a, INPUT_SHOOT),
+    (pygame.K_b, INPUT_BUILD),
+)
+
+
+def per_tick(speed):
+    """ Converts a speed in pixels a second into whole pixels a tick. """
+    return round(speed * FIXED_DT)
+
+
+def inputs_from_keys(keys):
+    """ Converts a `pygame.key.get_pressed()` result into an input bitmask. """
+    inputs = 0
+    for key, bit in _KEY_BITS:
+        if keys[key]:
+            inputs |= bit
+    return inputs
+
+
+"""
+SPRITE CLASSES
+"""
+
+class Player(pygame.sprite.DirtySprite):
+    def __init__(self, world):
+        super(Player, self).__init__()
+        self.world = world
+        self.image = images.get("player.png", (60, 60))
+        self.mask = images.mask("player.png", (60, 60))
+        self.rect = self.image.get_rect()
+        self.rect.centerx = WIDTH // 2
+        self.rect.centery = HEIGHT - 50  # Start lower on the screen
+        self.speed = per_tick(PLAYER_SPEED)
+        self.shooting = False  # Track if shooting key is pressed
+        self.building = False  # Track if building key is pressed
+        self.score = 0
+        self.powerup_count = 0
+        self.buildmargin = 0
+
+        # Add the sprite to apropriate groups upon instantiation
+        world.all_sprites.add(self)
+
+    def update(self):
+        inputs = self.world.inputs  # Passed to `tick()` or read from the world's input provider
+        if inputs & (INPUT_LEFT | INPUT_RIGHT | INPUT_UP | INPUT_DOWN):
+            self.dirty = 1  # Tell a dirty-rect renderer to redraw us
+        if inputs & INPUT_LEFT:
+            self.rect.x -= self.speed
+        if inputs & INPUT_RIGHT:
+            self.rect.x += self.speed
+        if inputs & INPUT_UP:
+            self.rect.y -= self.speed
+        if inputs & INPUT_DOWN:
+            self.rect.y += self.speed
+
+        # Keep the player within the screen boundaries
+        if self.rect.left < 0:
+            self.rect.left = 0
+        if self.rect.right > WIDTH:
+            self.rect.right = WIDTH
+        if self.rect.top < 0:
+            self.rect.top = 0
+        if self.rect.bottom > HEIGHT:
+            self.rect.bottom = HEIGHT
+
+        # Shoot the coin when 'a' key is pressed down
+        if inputs & INPUT_SHOOT and not self.shooting:
+            self.shoot()
+            self.shooting = True
+
+        # Reset shooting flag when 'a' key is released
+        if not inputs & INPUT_SHOOT and self.shooting:
+            self.shooting = False
+
+        # Build wall when 'b' key is pressed down
+        if inputs & INPUT_BUILD and not self.building:
+            self.build()
+            self.building = True
+
+        # Reset build wall flag when 'b' key is released
+        if not inputs & INPUT_BUILD and self.building:
+            self.building = False
+
+    def shoot(self):
+        self.world.spawn(ShootingObject, self.rect.centerx, self.rect.top)
+        self.score -= 50  #  Each shot costs 50 score points
+        self.world.emit("shot")
+
+    def build(self):
+        #if self.powerup_count > 0:
+            self.powerup_count -= 1  #  Each wall costs 1 powerup
+            self.world.emit("build")
+            self.buildmargin += 4
+            for i in range (10):
+                self.world.spawn(BuildingObject, i*WIDTH/10 + 30 + self.buildmargin, HEIGHT)
+
+class ShootingObject(Poolable, pygame.sprite.DirtySprite):
+    def __init__(self, world, x, y):
+        super(ShootingObject, self).__init__()
+        self.world = world
+        self.image = images.get("coin.png", (30, 30))
+        self.mask = images.mask("coin.png", (30, 30))
+        self.rect = self.image.get_rect()
+        self.speed = per_tick(COIN_SPEED)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """ Puts the sprite (back) into play at `x`, `y`. Pools call this to reuse it. """
+        self.rect.centerx = x
+        self.rect.centery = y
+        self.dirty = 1
+
+        # Add the sprite to appropriate groups
+        self.world.all_sprites.add(self)
+        self.world.shooting_objects.add(self)
+
+    def update(self):
+        self.rect.y -= self.speed
+        self.dirty = 1
+        if self.rect.bottom < 0:
+            self.kill()  # Remove the shooting object if it goes off the screen
+
+class BuildingObject(Poolable, pygame.sprite.DirtySprite):
+    def __init__(self, world, x, y):
+        super(BuildingObject, self).__init__()
+        self.world = world
+        self.image = images.get("wall.png", (60, 60))
+        self.mask = images.mask("wall.png", (60, 60))
+        self.rect = self.image.get_rect()
+        self.speed = per_tick(WALL_SPEED)
+        self.wobble = per_tick(WALL_WOBBLE)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """ Puts the sprite (back) into play at `x`, `y`. Pools call this to reuse it. """
+        self.rect.centerx = x
+        self.rect.centery = y
+        self.dirty = 1
+
+        # Add the sprite to appropriate groups
+        self.world.all_sprites.add(self)
+        self.world.building_objects.add(self)
+
+    def update(self):
+        if self.rect.y > 100:
+            self.rect.y -= self.speed
+            self.rect.x += self.world.random.randint(-self.wobble, self.wobble)
+            self.dirty = 1
+        if self.rect.bottom < 0:
+            self.kill()  # Remove the shooting object if it goes off the screen
+
+class FallingObject(Poolable, pygame.sprite.DirtySprite):
+    """
+    Creates a uniformly sized falling object sprite from an image file.
+    The falling speed, in pixels a tick, comes from `new_speed()`: a random
+    int from 1 up to the current level's speed cap unless a subclass says
+    otherwise.
+
+    Treat this superclass as abstract, and only call the subclasses directly.
+    """
+
+    def __init__(self, world, image_path):
+        super(FallingObject, self).__init__()
+        self.world = world
+        self.image = images.get(image_path, (40, 40))  # Shared, pre-scaled image
+        self.mask = images.mask(image_path, (40, 40))  # Shared collision mask
+        self.rect = self.image.get_rect()
+        self.reset()
+
+    def new_speed(self):
+        return self.world.random.randint(1, self.world.level_info.speed_cap)
+
+    def reset(self):
+        """ Drops the object (again) from a random spot above the screen. Pools call this to reuse it. """
+        world = self.world
+        self.speed = self.new_speed()
+        self.rect.x = world.random.randint(0, WIDTH - self.rect.width)
+        self.rect.y = -self.rect.height
+        self.dirty = 1
+
+        # Add the sprite to apropriate groups
+        world.falling_objects.add(self)
+        world.all_sprites.add(self)
+
+    def update(self):
+        self.rect.y += self.speed
+        self.dirty = 1
+        if self.rect.top > HEIGHT:
+            self.kill()  # Remove the object when it goes off the screen
+
+class FallingMoneyObject(FallingObject):
+    """ Subclass of `FallingObject` for the 'money' sprite. """
+    kind = KIND_MONEY
+
+    def __init__(self, world):
+        super(FallingMoneyObject, self).__init__(world, "money.png")
+
+class FallingDocumentsObject(FallingObject):
+    """ Subclass of `FallingObject` for the 'document' sprite. """
+    kind = KIND_DOCUMENTS
+
+    def __init__(self, world):
+        super(FallingDocumentsObject, self).__init__(world, "documents.png")
+
+class FallingPowerUpObject(FallingObject):
+    """
+    Subclass of `FallingObject` for the 'power-up' sprite.
+
+    Note the speed is always maxed out to make it special.
+    """
+    kind = KIND_POWERUP
+
+    def __init__(self, world):
+        super(FallingPowerUpObject, self).__init__(world, "coin.png")
+
+    def new_speed(self):
+        return per_tick(POWERUP_SPEED)
+
+class FallingHouseObject(FallingObject):
+    """ Subclass of `FallingObject` for the 'document' sprite. """
+    kind = KIND_HOUSE
+
+    def __init__(self, world):
+        super(FallingHouseObject, self).__init__(world, "house.png")
+        self.image = images.get("house.png", (150, 150))
+        self.mask = None  # Its 40x40 rect is only the corner of the image, so collide by rect
+
+    def new_speed(self):
+        return per_tick(HOUSE_SPEED)
+
+    def reset(self):
+        super(FallingHouseObject, self).reset()
+        self.rect.x = WIDTH / 2 - 75
+
+    def update(self):
+        if self.rect.y < HEIGHT / 2:
+            self.rect.y += self.speed
+            self.dirty = 1
+
+FALLING_CLASSES = {
+    KIND_MONEY: FallingMoneyObject,
+    KIND_DOCUMENTS: FallingDocumentsObject,
+    KIND_POWERUP: FallingPowerUpObject,
+    KIND_HOUSE: FallingHouseObject,
+}
+
+"""
+SIMULATION
+"""
+
+class Simulation:
+    """
+    Holds the whole world state of one game and advances it in fixed ticks.
+
+    Nothing here touches the display, the mixer or the wall clock, so a game
+    can be stepped headlessly and as fast as the CPU allows. Anything that
+    wants to react to the game (sound, stats, ...) registers an observer
+    with `add_observer()`; observers are called as `observer(event, sim)`.
+
+    Events:
+        "shot"             the player fired a coin
+        "build"            the player built a wall
+        "document_shot"    a coin destroyed a document
+        "document_walled"  a wall destroyed a document
+        "money"            the player caught money
+        "powerup"          the player caught a power-up
+        "document_hit"     the player caught a document (game over)
+        "house"            the player reached the house (game over, won)
+
+    Falling objects are sprites by default. With `backend="numpy"` they are
+    kept in a `FallingArray` instead, which handles thousands of them per
+    tick. Both backends draw the same random numbers in the same order, so
+    a given seed and input sequence plays out identically on either.
+
+    Coins, walls and falling sprites come from per-class `SpritePool`s that
+    outlive `reset()`, so a long session stops allocating sprites once the
+    pools have warmed up. `pooling=False` builds every sprite fresh.
+
+    `step()` runs however many whole ticks fit in the time it is given, so
+    the game plays the same at any frame rate. With `interpolate` set, each
+    tick also notes where every sprite started it, and `alpha` says how far
+    into the next tick the leftover time reaches, so a renderer can draw
+    things part way along their last move instead of stuttering.
+    """
+
+    def __init__(self, seed=None, backend="sprites", pooling=True, schedule=None):
+        if backend not in ("sprites", "numpy"):
+            raise ValueError(f"Unknown falling object backend: {backend!r}")
+        self.backend = backend
+        self.schedule = schedule or load_schedule(tick_rate=TICK_RATE)  # A `levels.LevelSchedule`
+        self.invincible = False  # Documents don't end the game. For stress runs.
+        self.profiler = NullProfiler()  # Times the phases of each tick
+        self.observers = []
+        self.input_provider = None  # Supplies inputs to ticks run without any, see `inputs.py`
+        self.interpolate = False  # Keep `previous_positions` for drawing between ticks
+        self.pools = {
+            cls: SpritePool(cls, self, enabled=pooling)
+            for cls in (ShootingObject, BuildingObject) + tuple(FALLING_CLASSES.values())
+        }
+        self.all_sprites = pygame.sprite.Group()
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """ Starts a new game. Observers are kept. """
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.random = random.Random(self.seed)
+        if self.input_provider is not None:
+            self.input_provider.reset()
+
+        # Hand the last game's sprites back to their pools
+        for sprite in self.all_sprites.sprites():
+            sprite.kill()
+
+        self.all_sprites = pygame.sprite.Group()
+        self.falling_objects = pygame.sprite.Group()
+        self.shooting_objects = pygame.sprite.Group()
+        self.building_objects = pygame.sprite.Group()
+        self.falling_index = CollisionIndex()
+        self.falling_array = FallingArray(HEIGHT) if self.backend == "numpy" else None
+
+        self.ticks = 0
+        self.enter_level(0)
+        self.game_over = False
+        self.win = False
+        self.inputs = 0
+        self._accumulator = 0.0
+        self.previous_positions = {}  # Sprite -> (x, y) at the start of the last tick, with `interpolate`
+        self.recorder = None  # Gets every tick's inputs, see `replay.ReplayRecorder`
+
+        self.player = Player(self)
+
+    def enter_level(self, index):
+        """ Makes `index` the current level and notes when the next one starts. """
+        self.level = index
+        self.level_info = self.schedule.levels[index]
+        self._next_level_tick = self.schedule.next_start(index)
+
+    @property
+    def falling_count(self):
+        """ Number of falling objects on screen, whichever backend holds them. """
+        if self.falling_array is not None:
+            return len(self.falling_array)
+        return len(self.falling_objects)
+
+    def falling_state(self):
+        """ `(kind, x, y, width, height, speed)` of every falling object, whichever backend holds them. """
+        falling = self.falling_array
+        if falling is not None:
+            n = falling.count
+            return list(zip(falling.kind[:n].tolist(), falling.x[:n].tolist(), falling.y[:n].tolist(),
+                            falling.w[:n].tolist(), falling.h[:n].tolist(), falling.speed[:n].tolist()))
+        return [(obj.kind, obj.rect.x, obj.rect.y, obj.rect.width, obj.rect.height, obj.speed)
+                for obj in self.falling_objects]
+
+    @property
+    def alpha(self):
+        """
+        How far `step()` has got into the next tick, from 0 to 1. Always 1
+        without `interpolate` or once the game is over.
+        """
+        if not self.interpolate or self.game_over:
+            return 1.0
+        return min(max(self._accumulator / FIXED_DT, 0.0), 1.0)
+
+    @property
+    def elapsed_time(self):
+        """ Whole seconds of play so far. """
+        return self.ticks // TICK_RATE
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def emit(self, event):
+        for observer in self.observers:
+            observer(event, self)
+
+    def spawn(self, cls, *args):
+        """ Puts a `cls` sprite into play, reusing a pooled one if there is one. """
+        return self.pools[cls].acquire(*args)
+
+    def pool_stats(self):
+        """ Counters of every sprite pool, by class name. """
+        return {cls.__name__: pool.stats() for cls, pool in self.pools.items()}
+
+    def step(self, inputs=None, dt=FIXED_DT):
+        """
+        Advances the game by `dt` seconds with `inputs` held down, or with
+        whatever the input provider says for each tick if `inputs` is None.
+
+        Time is consumed in whole fixed ticks; any remainder is carried over
+        to the next call. Returns the number of ticks that were run.
+        """
+        self._accumulator += dt
+        ticks = 0
+        # A tiny tolerance keeps float error from dropping a tick.
+        while self._accumulator >= FIXED_DT - 1e-9:
+            self._accumulator -= FIXED_DT
+            self.tick(inputs)
+            ticks += 1
+        return ticks
+
+    def tick(self, inputs=None):
+        """
+        Advances the game by exactly one fixed tick. Without `inputs`, the
+        input provider is asked for them; without one, the player idles.
+        """
+        if self.game_over:
+            return
+
+        if inputs is None:
+            inputs = self.input_provider.get_inputs(self) if self.input_provider is not None else 0
+        if self.recorder is not None:
+            self.recorder.record(inputs)
+        self.inputs = inputs
+        self.ticks += 1
+        player = self.player
+        profiler = self.profiler
+
+        if self.interpolate:
+            self.previous_positions = {sprite: (sprite.rect.x, sprite.rect.y) for sprite in self.all_sprites}
+
+        # Move on to the next level once its start tick is reached
+        with profiler.section("level"):
+            while self.ticks >= self._next_level_tick:
+                self.enter_level(self.level + 1)
+
+        with profiler.section("spawn"):
+            # Add falling falling_objects
+            object_chance = self.random.randint(1, 100)
+
+            #Level difficulty logic
+            level = self.level_info
+            if object_chance <= level.spawn_chance:
+                self.create_random_falling_object(level.documents)
+            if level.house and not self.win:
+                self.win = True
+                self.spawn_falling(KIND_HOUSE)
+
+        with profiler.section("update"):
+            self.all_sprites.update()
+            if self.falling_array is not None:
+                self.falling_array.advance()
+
+        with profiler.section("collisions"):
+            if self.falling_array is None:
+                # Index the falling objects once, then run every collision query against it
+                self.falling_index.rebuild(self.falling_objects)
+
+            self.collide_projectiles(self.shooting_objects, "document_shot")
+            self.collide_projectiles(self.building_objects, "document_walled")
+
+            # Spawn power-ups
+            if player.score % 1000 == 0:
+                self.spawn_falling(KIND_POWERUP)
+
+            # Check for collisions with falling falling_objects
+            for kind in self.collide_player():
+                if kind == KIND_DOCUMENTS:
+                    self.game_over = not self.invincible
+                    self.emit("document_hit")
+                if kind == KIND_MONEY:
+                    player.score += 100
+                    self.emit("money")
+                if kind == KIND_POWERUP:
+                    #TODO: Give this a better name.
+                    player.powerup_count += 1
+                    self.emit("powerup")
+                if kind == KIND_HOUSE:
+                    self.game_over = True
+                    self.emit("house")
+
+        # Increase the score
+        player.score += 1
+
+    def collide_projectiles(self, projectiles, event):
+        """
+        Coins and walls destroy any document they touch, and are used up doing so.
+        Emits `event` for every document destroyed.
+        """
+        falling = self.falling_array
+        if falling is not None:
+            sprites = projectiles.sprites()
+            if not sprites or not len(falling):
+                return
+            # Test every projectile's rect at once, then settle the few that overlap
+            # in order, checking their masks, so a document is only ever destroyed
+            # by the first projectile to reach it
+            overlaps = falling.overlapping_rects([sprite.rect for sprite in sprites], KIND_DOCUMENTS)
+            destroyed = None
+            for i in overlaps.any(axis=1).nonzero()[0].tolist():
+                sprite = sprites[i]
+                hits = falling.narrow(overlaps[i], sprite.rect, sprite.mask)
+                if destroyed is not None:
+                    hits &= ~destroyed
+                hit_count = int(hits.sum())
+                if hit_count:
+                    for _ in range(hit_count):
+                        self.emit(event)
+                    destroyed = hits if destroyed is None else destroyed | hits
+                    sprite.kill()
+            if destroyed is not None:
+                falling.remove(destroyed)
+            return
+
+        for projectile, hits in self.falling_index.collide(projectiles):
+            for obj in hits:
+                if isinstance(obj, FallingDocumentsObject) and obj.alive():
+                    self.emit(event)
+
+                    #remove falling object and shooting object
+                    obj.kill()
+                    projectile.kill()
+
+    def collide_player(self):
+        """ Removes every falling object touching the player and returns their kinds. """
+        rect = self.player.rect
+        falling = self.falling_array
+        if falling is not None:
+            if not len(falling):
+                return []
+            hits = falling.touching(rect, self.player.mask)
+            kinds = falling.kinds(hits)
+            if kinds:
+                falling.remove(hits)
+            return kinds
+
+        collisions = [obj for obj in self.falling_index.query(rect, self.player.mask) if obj.alive()]
+        for obj in collisions:
+            obj.kill()
+        return [obj.kind for obj in collisions]
+
+    def spawn_falling(self, kind):
+        """ Spawns a falling object of `kind` at a random spot above the screen. """
+        falling = self.falling_array
+        if falling is None:
+            return self.spawn(FALLING_CLASSES[kind])
+
+        # Same random draws, in the same order, as the sprite constructors
+        if kind == KIND_POWERUP:
+            speed = per_tick(POWERUP_SPEED)
+        elif kind == KIND_HOUSE:
+            speed = per_tick(HOUSE_SPEED)
+        else:
+            speed = self.random.randint(1, self.level_info.speed_cap)
+        x = self.random.randint(0, WIDTH - 40)
+        if kind == KIND_HOUSE:
+            x = WIDTH // 2 - 75
+        falling.spawn(kind, x, -40, speed)
+
+    def create_random_falling_object(self, difficulty=50):
+        """
+        Randomly spawns either a money or a documents falling object.
+
+        `difficulty` should be a number between 0-100 and represents the percentage
+        chance of spawning documents.
+        """
+        if (difficulty > self.random.randrange(0, 100)):
+            return self.spawn_falling(KIND_DOCUMENTS)
+        else:
+            return self.spawn_falling(KIND_MONEY)
+
+
+"""
+HEADLESS RUNNER
+"""
+
+def run_headless(seconds=RUN_LENGTH, seed=None, policy=None, backend="sprites", stress=0, schedule=None):
+    """
+    Simulates up to `seconds` of play without a window and returns the
+    finished `Simulation`.
+
+    `policy` is called as `policy(sim)` before every tick and returns that
+    tick's input bitmask. Without one the player stands still.
+
+    `stress` tops the screen up to that many falling objects every tick and
+    makes the player invincible, so the run always lasts `seconds`.
+    """
+    sim = Simulation(seed, backend, schedule=schedule)
+    sim.invincible = bool(stress)
+    for _ in range(int(seconds * TICK_RATE)):
+        if sim.game_over:
+            break
+        for _ in range(stress - sim.falling_count):
+            sim.create_random_falling_object(50)
+        sim.tick(policy(sim) if policy else 0)
+    return sim
+
+
+def init_headless():
+    """ Initialises pygame with the SDL dummy drivers, for running without a window. """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.display.init()
+
+
+if __name__ == "__main__":
+    init_headless()
+    images.preload(SPRITE_SPECS)
+
+    parser = argparse.ArgumentParser(description="Run a game headlessly and time it.")
+    parser.add_argument("seed", type=int, nargs="?", default=None)
+    parser.add_argument("--seconds", type=float, default=RUN_LENGTH, help="seconds of play to simulate")
+    parser.add_argument("--backend", choices=("sprites", "numpy"), default="sprites")
+    parser.add_argument("--stress", type=int, default=0, metavar="N",
+                        help="keep N falling objects on screen and never end the game")
+    parser.add_argument("--levels", metavar="FILE", default=None, help="level table to play (default: levels.json)")
+    args = parser.parse_args()
+
+    schedule = load_schedule(args.levels, TICK_RATE)
+    start = time.perf_counter()
+    sim = run_headless(args.seconds, args.seed, backend=args.backend, stress=args.stress, schedule=schedule)
+    duration = time.perf_counter() - start
+    print(f"seed {sim.seed}: level {sim.level}, score {sim.player.score}, "
+          f"{sim.ticks} ticks ({sim.ticks / TICK_RATE:.1f}s of play) in {duration:.3f}s "
+          f"({sim.ticks / duration:.0f} ticks/s)")
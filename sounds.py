@@ -0,0 +1,147 @@
+import pygame
+import pygame.mixer
+
+from audiocache import cached_audio
+
+
+"""
+SOUND BANK
+"""
+
+# name: (file, volume, minimum milliseconds between two plays of this sound)
+SOUND_SPECS = {
+    "fired": ("fired.mp3", .4, 60),
+    "wall": ("wall.mp3", .4, 60),
+    "buildawall": ("buildawall.mp3", .4, 100),
+    "fail": ("fail.mp3", .8, 500),
+    "success": ("success.mp3", .8, 500),
+}
+
+THEME_FILE = "theme.mp3"
+
+# Channels reserved for sound effects so they never compete with anything
+# else that uses `pygame.mixer.find_channel()`.
+RESERVED_CHANNELS = 8
+
+
+class SoundBank:
+    """
+    Decodes every sound effect once and plays them through a fixed pool of
+    reserved mixer channels.
+
+    Each sound has a minimum interval between plays. Requests that arrive
+    sooner are dropped, so a burst of collisions in a single frame plays the
+    effect once instead of stacking twenty copies of it.
+
+    If the mixer is not available every method quietly does nothing, which
+    lets the game run without an audio device.
+
+    With `load=False` no sound is decoded up front; they are handed in later
+    with `add()`, typically from a `loader.AssetLoader`. Playing a sound that
+    has not arrived yet does nothing.
+    """
+
+    def __init__(self, specs=SOUND_SPECS, channels=RESERVED_CHANNELS, clock=None, load=True):
+        self.enabled = pygame.mixer.get_init() is not None
+        self._sounds = {}
+        self._min_interval = {}
+        self._last_played = {}
+        self._channels = []
+        self._next_channel = 0
+        self._clock = clock or pygame.time.get_ticks
+        self.played = 0
+        self.dropped = 0
+
+        if not self.enabled:
+            return
+
+        if pygame.mixer.get_num_channels() < channels:
+            pygame.mixer.set_num_channels(channels)
+        pygame.mixer.set_reserved(channels)
+        self._channels = [pygame.mixer.Channel(i) for i in range(channels)]
+
+        for name, (path, volume, min_interval) in specs.items():
+            self._min_interval[name] = min_interval
+            if load:
+                self.add(name, decode_sound(path, volume))
+
+    def add(self, name, sound):
+        """ Makes a decoded sound playable as `name`. """
+        if self.enabled:
+            self._sounds[name] = sound
+
+    def play(self, name):
+        """ Plays the sound called `name`, unless it was played too recently. """
+        sound = self._sounds.get(name)
+        if sound is None:
+            return False
+
+        now = self._clock()
+        last = self._last_played.get(name)
+        if last is not None and now - last < self._min_interval[name]:
+            self.dropped += 1
+            return False
+        self._last_played[name] = now
+
+        self._channel().play(sound)
+        self.played += 1
+        return True
+
+    def stop(self):
+        for channel in self._channels:
+            channel.stop()
+
+    def __contains__(self, name):
+        return name in self._sounds
+
+    def _channel(self):
+        # Prefer an idle channel, otherwise cut off the oldest one in turn.
+        for channel in self._channels:
+            if not channel.get_busy():
+                return channel
+        channel = self._channels[self._next_channel]
+        self._next_channel = (self._next_channel + 1) % len(self._channels)
+        return channel
+
+
+class Music:
+    """
+    The background theme, streamed by `pygame.mixer.music` from the audio
+    cache (see `audiocache.py`) a mixer buffer at a time.
+
+    `open()` installs the prepared file, which can arrive from a
+    `loader.AssetLoader` after `play()` was first called; the theme then
+    starts as soon as it is there. Until then, and for good if the file is
+    missing or the mixer is not available, every method does nothing.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.wanted = False
+
+    def open(self, path):
+        """ Loads the prepared theme at `path`, starting it if `play()` is waiting for it. """
+        if pygame.mixer.get_init() is None:
+            return
+        pygame.mixer.music.load(path)
+        self.loaded = True
+        if self.wanted:
+            self.play()
+
+    def play(self):
+        """ Starts the theme from the beginning. """
+        self.wanted = True
+        if self.loaded:
+            pygame.mixer.music.play()
+
+    def stop(self):
+        self.wanted = False
+        if self.loaded:
+            pygame.mixer.music.stop()
+
+
+def decode_sound(path, volume=1.0):
+    """ Loads one sound file through the audio cache. Safe to call from a worker thread. """
+    sound = pygame.mixer.Sound(cached_audio(path))
+    sound.set_volume(volume)
+    return sound
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+
+"""
+TEXT CACHE
+"""
+
+class TextCache:
+    """
+    Bounded LRU cache of rendered text surfaces, keyed by (font, text, color).
+
+    `pygame.font.Font.render()` rasterises the whole string every call, so
+    text that stays the same from frame to frame should come from here.
+    Once `maxsize` surfaces are held the least recently used one is dropped.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.maxsize:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+class TextWidget:
+    """
+    A piece of HUD text that is only re-rendered when its value changes.
+
+    `template` is formatted with the value, e.g. `"Score: {}"`. Call `set()`
+    every frame; it is cheap when the value is unchanged. Values that change
+    constantly, like the score, would only churn a `TextCache`, so widgets
+    render straight from the font.
+    """
+
+    def __init__(self, font, template, color, pos):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.pos = pos
+        self.value = None
+        self.surface = None
+
+    def set(self, value):
+        """ Updates the value. Returns True if the text had to be re-rendered. """
+        if value == self.value and self.surface is not None:
+            return False
+        self.value = value
+        self.surface = self.font.render(self.template.format(value), True, self.color)
+        return True
+
+    def draw(self, screen):
+        screen.blit(self.surface, self.pos)
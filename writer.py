@@ -0,0 +1,114 @@
+import collections
+import sys
+import threading
+import time
+
+
+"""
+BACKGROUND WRITER
+
+Every file the game writes while it runs (high scores, replays, frame
+traces) goes through one `BackgroundWriter`, so the frame loop only ever
+queues work and never waits on the disk.
+"""
+
+class BackgroundWriter:
+    """
+    Runs queued writes, in order, on a single background thread.
+
+    `submit(write, *args, key=...)` queues `write(*args)`. A write queued
+    with the `key` of one still waiting replaces it in place instead of
+    queueing another, so saving the same thing over and over costs one
+    write once the disk catches up. Pass arguments that are snapshots
+    (bytes, strings, copies), since the write runs later on another thread.
+
+    At most `max_pending` writes wait at once. Coalescing keeps repeated
+    saves down to one slot each, so the limit only matters if the disk falls
+    far behind; `submit()` then waits for room rather than lose a write,
+    and `stalls` counts how often that happened.
+
+    `flush()` waits for everything queued so far; `close()` flushes and
+    stops the thread. Call one of them before the program exits, since the
+    thread is a daemon and would otherwise die with writes still queued.
+    Exceptions raised by writes are printed and kept in `errors`.
+    """
+
+    def __init__(self, max_pending=64, name="writer"):
+        self.max_pending = max_pending
+        self.errors = []
+        self.written = 0
+        self.coalesced = 0
+        self.stalls = 0
+        self._order = collections.deque()  # Keys of the queued writes, oldest first
+        self._jobs = {}  # Key -> (write, args)
+        self._active = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        """ Writes queued and not yet finished. """
+        with self._lock:
+            return len(self._order) + self._active
+
+    def submit(self, write, *args, key=None):
+        """ Queues `write(*args)`, replacing a waiting write with the same `key`. """
+        with self._changed:
+            if self._closed:
+                raise RuntimeError("The writer has been closed")
+            if key is not None and key in self._jobs:
+                self._jobs[key] = (write, args)
+                self.coalesced += 1
+                return
+            if len(self._order) >= self.max_pending:
+                self.stalls += 1
+                while len(self._order) >= self.max_pending:
+                    self._changed.wait()
+            if key is None:
+                key = object()
+            self._order.append(key)
+            self._jobs[key] = (write, args)
+            self._changed.notify_all()
+
+    def flush(self, timeout=None):
+        """ Waits until every write queued so far is done. Returns False on timeout. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while self._order or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """ Finishes the queued writes and stops the thread. Returns False on timeout. """
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while not self._order and not self._closed:
+                    self._changed.wait()
+                if not self._order:
+                    return
+                write, args = self._jobs.pop(self._order.popleft())
+                self._active += 1
+                self._changed.notify_all()  # Room for a stalled `submit()`
+            try:
+                write(*args)
+            except Exception as error:
+                self.errors.append(error)
+                print(f"Background write failed: {error!r}", file=sys.stderr)
+            finally:
+                with self._changed:
+                    self._active -= 1
+                    self.written += 1
+                    self._changed.notify_all()